@@ -0,0 +1,115 @@
+import os
+import random
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.order_extractor import ORDER_PATTERNS, extract_order_candidates  # noqa: E402
+
+LEGACY_PATTERNS = [
+    r"заказ[:\s]*([A-Z0-9]{10,})",
+    r"сборочное[:\s]*([A-Z0-9]{10,})",
+    r"\b([A-Z]{2,3}\d{7,9})\b",
+    r"номер[:\s]*([A-Z0-9]{10,})",
+    r"order[:\s]*([A-Z0-9]{10,})",
+    r"DAy\.([a-f0-9]{32})",
+    r"([a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12})",
+]
+
+# Типичные сообщения покупателей (персональные данные заменены)
+CORPUS = [
+    "Здравствуйте! Прикрепляю фото для заказа",
+    "Добрый день, заказ 4192894097123 оформила вчера, когда будет готово?",
+    "Вот фотографии",
+    "",
+    "Можно ли поменять фото? Номер: 3729104558811",
+    "сборочное задание 5518203394",
+    "Заказ DAy.aa2b0f37e1744109a18cd38944ad50f1 прикрепляю фото",
+    "order 12345678901, please check",
+    "Спасибо большое!!! 🥰",
+    "Подскажите, пожалуйста, сколько по времени изготавливается заказ? Очень ждем к празднику",
+    "ID 0c3f2a1e-9b7d-4e2a-8c1f-5d6e7f8a9b0c",
+    "Код ВБ AB12345678",
+    "Хочу уточнить по заказу, я случайно загрузила не то фото, вот правильное",
+] * 20
+
+# Перекрывающиеся совпадения разных типов: проверяются только на равенство
+OVERLAP_CASES = [
+    "номер:ABC12345678  AB1234567",
+    "заказ:AB12345678 ABC1234567",
+    "order:XYZ123456789 DAy.aa2b0f37e1744109a18cd38944ad50f1",
+    "номер AB123456789 0c3f2a1e-9b7d-4e2a-8c1f-5d6e7f8a9b0c",
+]
+
+RANDOM_TOKENS = [
+    "заказ", "сборочное", "номер", "order", "DAy.", ":", " ", "-",
+    "AB", "ABC", "1234567", "12345678", "123456789", "0123456789",
+    "aa2b0f37e1744109a18cd38944ad50f1", "0c3f2a1e-9b7d-4e2a-8c1f-5d6e7f8a9b0c",
+    "ЗАКАЗ", "Order:", "зᲀказ", "٣٤٥٦٧٨٩",
+]
+
+
+def random_texts(count, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield "".join(
+            rng.choice(RANDOM_TOKENS) for _ in range(rng.randint(1, 8))
+        )
+
+
+def legacy_extract(text):
+    if not text:
+        return None
+    for pattern in LEGACY_PATTERNS:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            return match.group(1)
+    return None
+
+
+def legacy_candidates(text):
+    # Все кандидаты без предварительных проверок: по finditer на шаблон
+    if not text:
+        return []
+    candidates = []
+    for kind, pattern in ORDER_PATTERNS:
+        for match in re.finditer(pattern, text, re.IGNORECASE):
+            candidate = (match.group(kind), kind)
+            if candidate not in candidates:
+                candidates.append(candidate)
+    return candidates
+
+
+def first_value(candidates):
+    # Кандидаты идут в порядке приоритета шаблонов, как в legacy_extract
+    return candidates[0][0] if candidates else None
+
+
+def run_corpus(extract):
+    for text in CORPUS:
+        extract(text)
+
+
+if __name__ == "__main__":
+    checked = set(CORPUS) | set(OVERLAP_CASES) | set(random_texts(200000))
+    mismatches = []
+    for text in checked:
+        candidates = extract_order_candidates(text)
+        if candidates != legacy_candidates(text) or (
+            first_value(candidates) != legacy_extract(text)
+        ):
+            mismatches.append(text)
+    print(f"Проверено текстов: {len(checked)}, расхождений: {len(mismatches)}")
+    for text in mismatches:
+        print(f"   {text!r}: {legacy_candidates(text)} != {extract_order_candidates(text)}")
+
+    for name, extract in [
+        ("последовательный re.search (один номер)", legacy_extract),
+        ("finditer по каждому шаблону (все кандидаты)", legacy_candidates),
+        ("extract_order_candidates", extract_order_candidates),
+    ]:
+        best = min(timeit.repeat(lambda: run_corpus(extract), number=50, repeat=5))
+        per_message = best / (50 * len(CORPUS)) * 1e6
+        print(f"{name}: {per_message:.2f} мкс на сообщение")
@@ -26,10 +26,11 @@ if [ -f "$DB_FILE" ]; then
     BACKUP_DIR="$WORK_DIR/backups"
     mkdir -p "$BACKUP_DIR"
     BACKUP_FILE="$BACKUP_DIR/wb_orders_$(date +%Y%m%d_%H%M%S).db"
-    cp "$DB_FILE" "$BACKUP_FILE"
+    # .backup учитывает незафиксированный WAL-журнал, в отличие от cp
+    sqlite3 "$DB_FILE" ".backup '$BACKUP_FILE'" 2>/dev/null || cp "$DB_FILE" "$BACKUP_FILE"
     
     # Оптимизируем
-    sqlite3 "$DB_FILE" "VACUUM; ANALYZE;" 2>/dev/null
+    sqlite3 "$DB_FILE" "PRAGMA wal_checkpoint(TRUNCATE); VACUUM; ANALYZE;" 2>/dev/null
     
     # Удаляем старые резервные копии (старше 30 дней)
     find "$BACKUP_DIR" -name "*.db" -mtime +30 -delete 2>/dev/null
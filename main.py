@@ -1,15 +1,27 @@
+import asyncio
+import json
 import logging
 import os
 import subprocess
 import sys
+import threading
 import time
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
-import requests
 from dotenv import load_dotenv
 
+from modules.chat_rid_index import ChatRidIndex
+from modules.chat_history import extract_chats
 from modules.database import DatabaseManager
+from modules.event_index import ChatEventIndex
+from modules.media_jobs import MediaJobQueue
+from modules.media_transfer import MediaTransferPool
+from modules.outbox import KIND_WELCOME, OutboxWorker
+from modules.rid_resolver import SOURCE_CACHE, SOURCE_LABELS, RidResolver
+from modules.scheduler import FIXED_DELAY, FIXED_RATE, Scheduler
+from modules.processed_events import ProcessedEventStore
 from modules.wb_chat import WBChatAPI
 from modules.wb_marketplace_api import WBMarketplaceAPI
 from modules.yandex_disk import YandexDiskManager
@@ -90,41 +102,96 @@ class WBAutoBot:
             raise ValueError("YANDEX_DISK_TOKEN не найден в .env файле")
 
         print("Ключи загружены из .env файла")
+        self.wb_key = wb_key
+
+        http_pool_size = int(os.getenv("HTTP_POOL_SIZE", "10"))
 
         print("Инициализация DatabaseManager...")
         self.db = DatabaseManager()
         print("Инициализация YandexDiskManager...")
-        self.disk = YandexDiskManager(yandex_token)
+        self.disk = YandexDiskManager(
+            yandex_token, folder_store=self.db, pool_size=http_pool_size
+        )
         print("Инициализация WBMarketplaceAPI...")
-        self.orders_api = WBMarketplaceAPI(wb_key)
+        self.orders_api = WBMarketplaceAPI(
+            wb_key,
+            pool_size=http_pool_size,
+            orders_ttl=int(os.getenv("ORDERS_SNAPSHOT_TTL", "60")),
+        )
+
+        # Курсор и хранилище обработанных событий переживают перезапуск
+        self.processed_events = ProcessedEventStore(self.db)
+        self.last_check_time = int(
+            self.db.get_state("chat_last_check_time", int(time.time() * 1000))
+        )
+        logging.info(f"Курсор событий чата: {self.last_check_time}")
 
         print("Инициализация WBChatAPI...")
-        self.chat_api = WBChatAPI(wb_chat_key)
+        self.chat_api = WBChatAPI(
+            wb_chat_key,
+            history_ttl=int(os.getenv("CHAT_HISTORY_TTL", "60")),
+            reply_sign_store=self.db,
+            pool_size=http_pool_size,
+            history_cursor=self.last_check_time,
+        )
+        self.chat_rid_index = ChatRidIndex(self.db)
+        self.rid_resolver = RidResolver(self.db, self.chat_rid_index)
 
-        self.processed_event_ids = set()
-        self.last_check_time = int(time.time() * 1000)
-        self.chat_rid_cache = {}
+        # Автоответы уходят через очередь в SQLite отдельным потоком
+        self.outbox = OutboxWorker(self.db, self.chat_api)
 
-        self.processed_chats = set()
+        media_streaming = os.getenv("MEDIA_STREAMING", "0") == "1"
+        # Дедупликации нужен хеш до загрузки, поэтому при потоковой передаче
+        # файл пишется во временный файл на диске; по умолчанию ее отключаем
+        media_dedup = os.getenv("MEDIA_DEDUP", "0" if media_streaming else "1") == "1"
+        if media_streaming and media_dedup:
+            logging.warning(
+                "MEDIA_DEDUP=1 при MEDIA_STREAMING=1: медиа буферизуются во временные "
+                "файлы для подсчета хеша, выигрыш потоковой передачи теряется"
+            )
+        self.media_pool = MediaTransferPool(
+            self.disk,
+            max_workers=int(os.getenv("MEDIA_WORKERS", "8")),
+            per_host_limit=int(os.getenv("MEDIA_PER_HOST", "4")),
+            streaming=media_streaming,
+            chunk_size=int(os.getenv("MEDIA_CHUNK_SIZE", str(64 * 1024))),
+            hash_store=self.db if media_dedup else None,
+        )
+        # Задания передачи медиа хранятся в БД и переживают сбои и перезапуски
+        self.media_jobs = MediaJobQueue(
+            self.db,
+            self.media_pool,
+            max_attempts=int(os.getenv("MEDIA_JOB_MAX_ATTEMPTS", "6")),
+            base_delay=int(os.getenv("MEDIA_JOB_RETRY_DELAY", "30")),
+        )
+        self._media_ts_lock = threading.Lock()
+        self._last_media_ts = 0
 
         print("Все модули бота инициализированы")
 
-    def process_new_tasks(self):
+    def process_new_tasks(self, orders=None):
         logging.info("Начинаем обработку заказов через Marketplace API...")
-        orders = self.orders_api.get_new_orders()
+        if orders is None:
+            # Свежий снимок на каждый цикл; чаты переиспользуют его в пределах TTL
+            orders, diff = self.orders_api.get_orders_diff(max_age=0)
+        elif orders:
+            diff = self.orders_api.store_snapshot(orders)
 
         if not orders:
             logging.info("Новых заказов не найдено.")
             return
 
-        processed_count = 0
-        for order in orders:
-            order_id = str(order.get("id"))
-            if not order_id:
-                continue
+        if not diff.added:
+            logging.info("Список заказов не изменился с прошлого опроса.")
 
-            if self.db.get_task_by_rid(order_id):
-                continue
+        new_orders = self.db.filter_new_orders(orders)
+        if not new_orders:
+            logging.info("Все полученные заказы уже есть в базе.")
+            return
+
+        rows = []
+        for order in new_orders:
+            order_id = str(order.get("id"))
 
             logging.info("НОВЫЙ ЗАКАЗ ОБНАРУЖЕН:")
             logging.info(f"   ID: {order_id}")
@@ -134,52 +201,50 @@ class WBAutoBot:
             logging.info(f"   nmId: {order.get('nmId', 'N/A')}")
             logging.info(f"   Цена: {order.get('price', 'N/A')}")
 
-            if self.disk.create_folder(f"WB_Orders/{order_id}"):
-                self.db.add_assembly_task(
-                    rid=order_id,
-                    orderUid=order.get("orderUid"),
-                    nmId=order.get("nmId"),
-                    article=order.get("article"),
-                    price=order.get("price", 0) / 100,
-                    createdAt=order.get("createdAt"),
+            if self.disk.ensure_path(f"WB_Orders/{order_id}"):
+                rows.append(
+                    (
+                        order_id,
+                        order.get("orderUid"),
+                        order.get("nmId"),
+                        order.get("article"),
+                        order.get("price", 0) / 100,
+                        order.get("createdAt"),
+                        "new",
+                    )
                 )
-                processed_count += 1
-                logging.info(f"Создана папка и запись для заказа: {order_id}")
+                logging.info(f"Создана папка для заказа: {order_id}")
 
+        processed_count = self.db.add_assembly_tasks_bulk(rows)
         logging.info(f"Обработано новых заказов: {processed_count}")
 
     def process_chat_events(self):
         try:
             chats_data = self.chat_api.get_chats_list()
-            chats_count = (
-                len(chats_data["result"])
-                if chats_data and "result" in chats_data
-                else 0
-            )
-            logging.info(f"Чатов: {chats_count}")
-
-            events_data = self.chat_api.get_chat_events(self.last_check_time)
+            logging.info(f"Чатов: {len(extract_chats(chats_data))}")
 
             new_messages_count = 0
             saved_media_count = 0
-
-            if events_data and "result" in events_data:
-                events_list = events_data["result"].get("events", [])
+            pending_media = []
+            # Индекс событий опроса по chatID: поиск RID за O(1) вместо
+            # линейного прохода по всей ленте для каждого сообщения
+            event_index = ChatEventIndex()
+
+            # Проходим все страницы ленты по курсору next, пока не догоним сервер
+            for events_list, next_cursor in self.chat_api.iter_event_pages(
+                self.last_check_time
+            ):
+                event_index.add(events_list)
+                self.chat_api.extend_history(events_list, next_cursor)
 
                 for event in events_list:
                     event_id = event.get("eventID")
-                    event_time = event.get("addTimestamp", 0)
 
                     # Пропускаем уже обработанные события
-                    if event_id in self.processed_event_ids:
+                    if event_id in self.processed_events:
                         continue
 
-                    if (
-                        event_time > self.last_check_time
-                        and event.get("eventType") == "message"
-                    ):
-                        self.processed_event_ids.add(event_id)
-
+                    if event.get("eventType") == "message":
                         if event.get("sender") == "client":
                             new_messages_count += 1
                             text = event.get("message", {}).get("text", "")
@@ -200,7 +265,6 @@ class WBAutoBot:
                             logging.info(f"      ID чата: {chat_id}")
 
                             rid = None
-                            found_by = None
 
                             # Безопасное получение images (должно быть ДО условия с rid)
                             message_data = event.get("message", {}) or {}
@@ -213,64 +277,37 @@ class WBAutoBot:
                                 f"      Проверка медиа-вложений: {len(images)} изображений"
                             )
 
-                            if chat_id in self.chat_rid_cache:
-                                rid = self.chat_rid_cache[chat_id]
-                                found_by = "кэша чата"
-                                logging.info(f"      Найден RID из {found_by}: {rid}")
-                            else:
-                                # Используем уже полученные message_data и attachments
-                                good_card = attachments.get("goodCard")
-
-                                if good_card:
-                                    rid = good_card.get("rid")
-                                    if rid:
-                                        found_by = "goodCard текущего сообщения"
-                                        nm_id = good_card.get("nmID")
-                                        logging.info(
-                                            f"      Найден RID из {found_by}: {rid} (арт. {nm_id})"
-                                        )
-
-                                if not rid and text:
-                                    extracted_rid = self.extract_order_from_text(text)
-                                    if extracted_rid:
-                                        rid = extracted_rid
-                                        found_by = "текста сообщения"
-                                        logging.info(
-                                            f"      Найден RID из {found_by}: {rid}"
-                                        )
-
-                                if not rid:
-                                    rid_from_current = self.find_rid_in_current_events(
-                                        chat_id, events_list
-                                    )
-                                    if rid_from_current:
-                                        rid = rid_from_current
-                                        found_by = "текущих событий"
-                                        logging.info(
-                                            f"      Найден RID из {found_by}: {rid}"
-                                        )
-
-                                if not rid:
-                                    rid_from_history = (
-                                        self.find_any_rid_in_chat_history(chat_id)
+                            # Собираем всех кандидатов сразу и выбираем лучший
+                            # по оценке с проверкой по базе заказов
+                            resolution = self.rid_resolver.resolve(
+                                chat_id, attachments, text, event_index
+                            )
+                            matched_order_id = None
+
+                            if resolution:
+                                rid = resolution.rid
+                                matched_order_id = resolution.order_id
+                                found_by = SOURCE_LABELS[resolution.source]
+                                logging.info(
+                                    f"      Найден RID из {found_by}: {rid} (оценка {resolution.score})"
+                                )
+
+                                # Запись только при смене RID: источник, под которым
+                                # RID был найден впервые, не перезаписывается
+                                if rid != self.chat_rid_index.get(chat_id):
+                                    self.chat_rid_index.put(
+                                        chat_id, rid, resolution.source
                                     )
-                                    if rid_from_history:
-                                        rid = rid_from_history
-                                        found_by = "истории чата"
-                                        logging.info(
-                                            f"      Найден RID из {found_by}: {rid}"
-                                        )
-
-                                if rid:
-                                    self.chat_rid_cache[chat_id] = rid
                                     logging.info(
                                         f"      Сохранен RID в кэш для чата {chat_id}"
                                     )
 
-                                    # Обновляем активность заказа
-                                    matched_order = self.match_chat_rid_to_order(rid)
-                                    if matched_order:
-                                        self.db.update_last_activity(matched_order)
+                                # Обновляем активность заказа
+                                if (
+                                    matched_order_id
+                                    and resolution.source != SOURCE_CACHE
+                                ):
+                                    self.db.update_last_activity(matched_order_id)
 
                             def clean_folder_name(name):
                                 cleaned = re.sub(r'[<>:"/\\|?*]', "_", name)
@@ -280,8 +317,6 @@ class WBAutoBot:
                             client_name_clean = clean_folder_name(client_name)
 
                             if rid:
-                                matched_order_id = self.match_chat_rid_to_order(rid)
-
                                 if matched_order_id:
                                     order_folder = f"WB_Orders/{matched_order_id}"
                                     folder_type = "заказа"
@@ -304,26 +339,19 @@ class WBAutoBot:
                                     "      RID не найден, сохраняем в папку чата"
                                 )
 
-                            # Проверка images перед вызовом download_chat_media
+                            # Проверка images перед постановкой медиа в очередь
                             if images and isinstance(images, list) and len(images) > 0:
                                 logging.info(
                                     f"      Обнаружены медиа-вложения: {len(images)} изображений..."
                                 )
 
-                                if self.disk.create_folder(order_folder):
-                                    time.sleep(1)
-                                    saved_files = self.download_chat_media(
+                                if self.disk.ensure_path(order_folder):
+                                    futures = self.submit_chat_media(
                                         event, order_folder, client_name
                                     )
-                                    if saved_files:
-                                        saved_media_count += len(saved_files)
-                                        logging.info(
-                                            f"      Сохранено файлов в папку {folder_type}: {len(saved_files)}"
-                                        )
-                                    else:
-                                        logging.error(
-                                            "      Не удалось сохранить медиа-файлы"
-                                        )
+                                    pending_media.append(
+                                        (order_folder, folder_type, futures)
+                                    )
                                 else:
                                     logging.error(
                                         f"      Не удалось создать папку: {order_folder}"
@@ -346,14 +374,31 @@ class WBAutoBot:
                                     "      Чат уже обработан, повторный автоответ не нужен"
                                 )
 
-                self.last_check_time = int(time.time() * 1000)
+                        # Событие отмечается только после полной обработки: при
+                        # сбое посередине оно будет обработано заново после рестарта
+                        self.processed_events.add(event_id)
+
+                # Курсор сервера сохраняется после каждой обработанной страницы
+                if next_cursor:
+                    self.last_check_time = next_cursor
+                    self.db.set_state("chat_last_check_time", self.last_check_time)
 
-                logging.info(f"Новых сообщений: {new_messages_count}")
-                if saved_media_count > 0:
-                    logging.info(f"Сохранено медиа-файлов: {saved_media_count}")
+            # Дожидаемся всех передач медиа, запущенных за этот опрос
+            for order_folder, folder_type, futures in pending_media:
+                saved_files = self.collect_media_results(futures)
+                if saved_files:
+                    saved_media_count += len(saved_files)
+                    logging.info(
+                        f"Сохранено файлов в папку {folder_type} {order_folder}: {len(saved_files)}"
+                    )
+                elif futures:
+                    logging.error(f"Не удалось сохранить медиа-файлы в {order_folder}")
 
-                if len(self.processed_event_ids) > 1000:
-                    self.processed_event_ids = set()
+            logging.info(f"Новых сообщений: {new_messages_count}")
+            if saved_media_count > 0:
+                logging.info(f"Сохранено медиа-файлов: {saved_media_count}")
+
+            self.processed_events.prune()
 
         except Exception as e:
             logging.error(f"Ошибка обработки событий чата: {e}")
@@ -365,86 +410,6 @@ class WBAutoBot:
             logging.error(f"Ошибка поиска RID в истории чата: {e}")
             return None
 
-    def extract_order_from_text(self, text):
-        import re
-
-        if not text:
-            return None
-
-        patterns = [
-            r"заказ[:\s]*([A-Z0-9]{10,})",
-            r"сборочное[:\s]*([A-Z0-9]{10,})",
-            r"\b([A-Z]{2,3}\d{7,9})\b",
-            r"номер[:\s]*([A-Z0-9]{10,})",
-            r"order[:\s]*([A-Z0-9]{10,})",
-            r"DAy\.([a-f0-9]{32})",
-            r"([a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12})",
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                found = match.group(1)
-                logging.info(f"      Найден номер в тексте: {found}")
-                return found
-        return None
-
-    def find_rid_in_current_events(self, chat_id, current_events_list):
-        try:
-            for event in current_events_list:
-                if event.get("chatID") == chat_id:
-                    message_data = event.get("message", {})
-                    if not message_data:
-                        continue
-
-                    attachments = message_data.get("attachments", {})
-                    good_card = attachments.get("goodCard")
-
-                    if good_card and good_card.get("rid"):
-                        rid = good_card.get("rid")
-                        nm_id = good_card.get("nmID")
-                        logging.info(
-                            f"      Найден RID в текущих событиях: {rid} (арт. {nm_id})"
-                        )
-                        return rid
-            return None
-        except Exception as e:
-            logging.error(f"Ошибка поиска RID в текущих событиях: {e}")
-            return None
-
-    def find_any_rid_in_chat_history(self, chat_id):
-        try:
-            events_data = self.chat_api.get_chat_events()
-
-            if events_data and "result" in events_data:
-                events_list = events_data["result"].get("events", [])
-
-                for event in events_list:
-                    if event.get("chatID") == chat_id:
-                        message_data = event.get("message", {})
-                        if not message_data:
-                            continue
-
-                        attachments = message_data.get("attachments", {})
-                        good_card = attachments.get("goodCard")
-
-                        if good_card and good_card.get("rid"):
-                            rid = good_card.get("rid")
-                            nm_id = good_card.get("nmID")
-                            logging.info(
-                                f"      Найден RID из истории чата: {rid} (арт. {nm_id})"
-                            )
-                            return rid
-
-                logging.info(f"      RID не найден в истории чата {chat_id}")
-            else:
-                logging.info(f"      Нет истории для чата {chat_id}")
-
-            return None
-        except Exception as e:
-            logging.error(f"Ошибка поиска любого RID в истории: {e}")
-            return None
-
     def find_recent_order_by_client(self, client_name):
         try:
 
@@ -468,20 +433,15 @@ class WBAutoBot:
 
     def match_chat_rid_to_order(self, chat_rid):
         try:
-            if not chat_rid or "." not in chat_rid:
+            if not chat_rid:
                 return None
 
-            parts = chat_rid.split(".")
-            if len(parts) >= 2:
-                order_uid_from_chat = parts[1]
-
-                order_from_db = self.db.get_task_by_order_uid(order_uid_from_chat)
-                if order_from_db:
-                    order_id = order_from_db[1]
-                    logging.info(
-                        f"      Сопоставлен RID чата '{chat_rid}' с заказом '{order_id}'"
-                    )
-                    return order_id
+            order_id = self.db.match_rid_candidates([chat_rid]).get(chat_rid)
+            if order_id:
+                logging.info(
+                    f"      Сопоставлен RID чата '{chat_rid}' с заказом '{order_id}'"
+                )
+                return order_id
 
             logging.info(f"      Не найдено соответствие для RID: {chat_rid}")
             return None
@@ -489,36 +449,149 @@ class WBAutoBot:
             logging.error(f"Ошибка сопоставления RID: {e}")
             return None
 
-    def start(self, interval_seconds=30):
+    def start(self, interval_seconds=30, inactivity_interval=600):
         logging.info("\nЗАПУСК АВТОМАТИЗАЦИИ WB")
         logging.info(
             f"Бот будет проверять новые задания и чаты каждые {interval_seconds} секунд."
         )
 
+        self.outbox.start()
+        self.media_jobs.start()
+
+        self.scheduler = Scheduler(
+            max_workers=int(os.getenv("SCHEDULER_WORKERS", "4"))
+        )
+        jitter = float(os.getenv("SCHEDULER_JITTER", "2"))
+
+        # Опросы идут с фиксированным темпом, тяжелые задачи - с паузой
+        # после завершения; пересечение запусков одной задачи исключено
+        self.scheduler.add_job(
+            "orders", self.process_new_tasks, interval_seconds, FIXED_RATE, jitter
+        )
+        self.scheduler.add_job(
+            "chats", self.process_chat_events, interval_seconds, FIXED_RATE, jitter
+        )
+        self.scheduler.add_job(
+            "inactivity",
+            self.process_inactive_orders,
+            inactivity_interval,
+            FIXED_DELAY,
+            jitter,
+            run_immediately=False,
+            inactive_hours=24,
+        )
+        self.scheduler.add_job(
+            "db_maintenance",
+            self.db.run_maintenance,
+            int(os.getenv("DB_MAINTENANCE_INTERVAL", "3600")),
+            FIXED_DELAY,
+            jitter,
+            run_immediately=False,
+        )
+        self.scheduler.add_job(
+            "metrics",
+            self.flush_metrics,
+            int(os.getenv("METRICS_INTERVAL", "300")),
+            FIXED_DELAY,
+            run_immediately=False,
+        )
+
         try:
-            iteration = 0
-            while True:
-                iteration += 1
-                logging.info(f"\n{'='*50}")
-                logging.info(
-                    f"ЦИКЛ #{iteration} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-                )
+            self.scheduler.run_forever()
+        except Exception as e:
+            logging.critical(f"Критическая ошибка в основном цикле: {e}")
+        finally:
+            self.scheduler.stop(wait=False)
+
+    def flush_metrics(self):
+        metrics = {
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "queues": self.db.get_queue_stats(),
+        }
+        scheduler = getattr(self, "scheduler", None)
+        if scheduler:
+            metrics["jobs"] = scheduler.stats()
+
+        logging.info(f"Метрики: {json.dumps(metrics, ensure_ascii=False)}")
+        self.db.set_state("metrics", json.dumps(metrics, ensure_ascii=False))
+
+    async def _run_pipeline(self, name, func, interval_seconds, **kwargs):
+        logging.info(f"Конвейер '{name}' запущен, период {interval_seconds} секунд")
+        while True:
+            started = time.monotonic()
+            try:
+                if asyncio.iscoroutinefunction(func):
+                    await func(**kwargs)
+                else:
+                    # Синхронные конвейеры выполняем в пуле потоков, чтобы
+                    # медленный вызов не блокировал остальные конвейеры
+                    await asyncio.to_thread(func, **kwargs)
+            except Exception as e:
+                logging.error(f"Ошибка в конвейере '{name}': {e}")
+
+            elapsed = time.monotonic() - started
+            await asyncio.sleep(max(0.0, interval_seconds - elapsed))
+
+    async def _poll_orders_async(self, orders_api):
+        orders = await orders_api.get_new_orders()
+        await asyncio.to_thread(self.process_new_tasks, orders)
+
+    async def start_async(
+        self, orders_interval=60, chat_interval=10, inactivity_interval=600
+    ):
+        logging.info("\nЗАПУСК АВТОМАТИЗАЦИИ WB (асинхронный режим)")
+        logging.info(
+            f"Заказы: каждые {orders_interval} с, чаты: каждые {chat_interval} с, "
+            f"неактивные заказы: каждые {inactivity_interval} с."
+        )
+
+        from modules.async_clients import AsyncWBMarketplaceAPI
 
-                self.process_new_tasks()
-                self.process_chat_events()
+        self.outbox.start()
+        self.media_jobs.start()
 
-                # Проверяем неактивные заказы каждые 10 итераций (примерно раз в 10 минут при interval=60)
-                if iteration % 10 == 0:
-                    self.process_inactive_orders(inactive_hours=24)
+        async_orders_api = AsyncWBMarketplaceAPI(
+            self.wb_key, pool_size=self.orders_api.pool_size
+        )
 
-                logging.info(f"Следующая проверка через {interval_seconds} секунд...")
-                time.sleep(interval_seconds)
+        pipelines = [
+            self._run_pipeline(
+                "orders",
+                self._poll_orders_async,
+                orders_interval,
+                orders_api=async_orders_api,
+            ),
+            self._run_pipeline("chats", self.process_chat_events, chat_interval),
+            self._run_pipeline(
+                "inactivity",
+                self.process_inactive_orders,
+                inactivity_interval,
+                inactive_hours=24,
+            ),
+            self._run_pipeline(
+                "db_maintenance",
+                self.db.run_maintenance,
+                int(os.getenv("DB_MAINTENANCE_INTERVAL", "3600")),
+            ),
+            self._run_pipeline(
+                "metrics", self.flush_metrics, int(os.getenv("METRICS_INTERVAL", "300"))
+            ),
+        ]
 
+        try:
+            await asyncio.gather(*pipelines)
         except Exception as e:
-            logging.critical(f"Критическая ошибка в основном цикле: {e}")
+            logging.critical(f"Критическая ошибка в асинхронном цикле: {e}")
+        finally:
+            await async_orders_api.close()
 
-    def download_chat_media(self, message_event, folder_name, client_name=None):
-        saved_files = []
+    def _next_media_timestamp(self):
+        with self._media_ts_lock:
+            self._last_media_ts = max(int(time.time() * 1000), self._last_media_ts + 1)
+            return self._last_media_ts
+
+    def submit_chat_media(self, message_event, folder_name, client_name=None):
+        futures = []
 
         try:
             # Безопасное получение images с проверками
@@ -540,6 +613,8 @@ class WBAutoBot:
                 logging.info("      Нет изображений для скачивания")
                 return []
 
+            timestamp = self._next_media_timestamp()
+
             for i, image in enumerate(images):
                 try:
                     image_url = image.get("url")
@@ -547,74 +622,63 @@ class WBAutoBot:
                         logging.warning(f"      Нет URL у изображения {i+1}")
                         continue
 
-                    logging.info(f"      Скачивание медиа {i+1}...")
+                    logging.info(f"      Постановка медиа {i+1} в очередь...")
                     logging.info(f"      URL: {image_url[:100]}...")
 
-                    response = requests.get(image_url, timeout=30, verify=False)
-
-                    logging.info(f"      Статус скачивания: {response.status_code}")
-
-                    if response.status_code == 200:
-                        file_size = len(response.content)
-                        logging.info(f"      Размер файла: {file_size} байт")
-
-                        timestamp = int(time.time() * 1000)
-                        file_extension = "jpg"
-                        if "." in image_url:
-                            ext = image_url.split(".")[-1].lower()
-                            if ext in ["jpg", "jpeg", "png", "gif", "webp"]:
-                                file_extension = ext
-
-                        if client_name:
-                            filename = (
-                                f"{client_name}_{timestamp}_{i+1}.{file_extension}"
-                            )
-                        else:
-                            filename = f"photo_{timestamp}_{i+1}.{file_extension}"
-
-                        disk_path = f"{folder_name}/{filename}"
-                        logging.info(f"      Загрузка на Яндекс.Диск: {disk_path}")
+                    file_extension = "jpg"
+                    if "." in image_url:
+                        ext = image_url.split(".")[-1].lower()
+                        if ext in ["jpg", "jpeg", "png", "gif", "webp"]:
+                            file_extension = ext
 
-                        if hasattr(self.disk, "upload_file_from_memory"):
-                            success = self.disk.upload_file_from_memory(
-                                response.content, disk_path
-                            )
-                            if success:
-                                saved_files.append(disk_path)
-                                logging.info(
-                                    f"      Файл загружен на Яндекс.Диск: {disk_path}"
-                                )
-                            else:
-                                logging.error(
-                                    f"      Ошибка загрузки на Яндекс.Диск: {disk_path}"
-                                )
-                        else:
-                            logging.error(
-                                "      Метод upload_file_from_memory не существует"
-                            )
+                    if client_name:
+                        filename = f"{client_name}_{timestamp}_{i+1}.{file_extension}"
                     else:
-                        logging.error(
-                            f"      Ошибка скачивания: {response.status_code}"
-                        )
+                        filename = f"photo_{timestamp}_{i+1}.{file_extension}"
+
+                    disk_path = f"{folder_name}/{filename}"
+                    future = self.media_jobs.submit(image_url, disk_path)
+                    if future:
+                        futures.append(future)
 
                 except Exception as e:
                     logging.error(f"      Ошибка обработки изображения {i+1}: {e}")
                     continue
 
-            logging.info(
-                f"      Итог: загружено на Яндекс.Диск {len(saved_files)} файлов"
-            )
-            return saved_files
+            return futures
 
         except Exception as e:
             logging.error(f"Общая ошибка сохранения медиа: {e}")
-            return []
+            return futures
 
-    def _is_chat_processed(self, chat_id):
-        return chat_id in self.processed_chats
+    def collect_media_results(self, futures):
+        saved_files = []
+
+        for future in futures:
+            try:
+                result = future.result()
+            except Exception as e:
+                logging.error(f"      Ошибка передачи медиа: {e}")
+                continue
+
+            if result.success and result.duplicate_of:
+                saved_files.append(result.duplicate_of)
+                logging.info(
+                    f"      Повтор файла {result.duplicate_of}, загрузка пропущена"
+                )
+            elif result.success:
+                saved_files.append(result.disk_path)
+                logging.info(f"      Файл загружен на Яндекс.Диск: {result.disk_path}")
+            else:
+                logging.error(
+                    f"      Не удалось сохранить {result.disk_path}: {result.error} "
+                    f"(задание останется в очереди для повтора)"
+                )
+
+        return saved_files
 
-    def _mark_chat_processed(self, chat_id):
-        self.processed_chats.add(chat_id)
+    def _is_chat_processed(self, chat_id):
+        return self.db.chat_has_outbox_message(chat_id, KIND_WELCOME)
 
     def _send_auto_reply(self, chat_id, rid, client_name, event_data=None):
         try:
@@ -639,13 +703,12 @@ class WBAutoBot:
                         f"   replySign ОТСУТСТВУЕТ в событии. Доступные ключи: {list(event_data.keys())}"
                     )
 
-            success = self.chat_api.send_message(chat_id, cleaned_message, reply_sign)
+            message_id = self.outbox.enqueue(
+                KIND_WELCOME, chat_id, rid, cleaned_message, reply_sign
+            )
 
-            if success:
-                self._mark_chat_processed(chat_id)
-                logging.info(f"Автоответ отправлен в чат {chat_id}")
-            else:
-                logging.error(f"Не удалось отправить автоответ в чат {chat_id}")
+            if not message_id:
+                logging.error(f"Не удалось поставить автоответ в очередь для чата {chat_id}")
 
         except Exception as e:
             logging.error(f"Ошибка отправки автоответа: {e}")
@@ -759,30 +822,74 @@ class WBAutoBot:
 
         logging.info(f"Найдено неактивных заказов: {len(inactive_orders)}")
 
+        batch_size = int(os.getenv("INACTIVITY_BATCH_SIZE", "200"))
+        workers = int(os.getenv("INACTIVITY_MOVE_WORKERS", "8"))
+
         moved_count = 0
-        for order in inactive_orders:
-            rid = order[0]
-            article = order[1]
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="move"
+        ) as executor:
+            for start in range(0, len(inactive_orders), batch_size):
+                batch = inactive_orders[start : start + batch_size]
+                moved_count += self._move_inactive_batch(batch, executor)
 
-            from_path = f"WB_Orders/{rid}"
-            to_path = f"WB_Empty_Orders/{rid}"
+        logging.info(f"Перемещено неактивных заказов: {moved_count}")
 
-            logging.info(f"Перемещение заказа {rid} ({article}) в WB_Empty_Orders...")
+    def _move_inactive_batch(self, batch, executor):
+        rids = [order[0] for order in batch]
+        statuses = executor.map(
+            lambda rid: self.disk.start_move(
+                f"WB_Orders/{rid}", f"WB_Empty_Orders/{rid}"
+            ),
+            rids,
+        )
 
-            if self.disk.move_folder(from_path, to_path):
-                self.db.mark_as_moved(rid)
-                moved_count += 1
-                logging.info(f"Заказ {rid} перемещён в WB_Empty_Orders")
+        moved, operations = [], {}
+        for rid, (status, href) in zip(rids, statuses):
+            if status == "pending" and href:
+                operations[rid] = href
+            elif status == "pending":
+                # 202 без ссылки на операцию: завершение не подтвердить,
+                # заказ будет перепроверен в следующем обходе
+                logging.warning(f"Перемещение заказа {rid} не подтверждено")
+            elif status == "done":
+                moved.append(rid)
+            elif status == "missing":
+                # Папки уже нет в WB_Orders: повторять перемещение бессмысленно
+                moved.append(rid)
             else:
                 logging.error(f"Не удалось переместить заказ {rid}")
 
-        logging.info(f"Перемещено неактивных заказов: {moved_count}")
+        if operations:
+            logging.info(f"Ожидание асинхронных перемещений: {len(operations)}")
+            for rid, status in self.disk.wait_operations(operations).items():
+                if status == "success":
+                    moved.append(rid)
+                else:
+                    # Незавершенные операции будут перепроверены в следующем обходе
+                    logging.error(f"Перемещение заказа {rid} не завершено: {status}")
+
+        self.db.mark_as_moved_bulk(moved)
+        logging.info(f"Пакет: перемещено {len(moved)} из {len(batch)} заказов")
+        return len(moved)
 
 
 if __name__ == "__main__":
     try:
         bot = WBAutoBot()
-        bot.start(interval_seconds=60)
+        if os.getenv("BOT_ASYNC_MODE", "0") == "1":
+            asyncio.run(
+                bot.start_async(
+                    orders_interval=int(os.getenv("ORDERS_INTERVAL", "60")),
+                    chat_interval=int(os.getenv("CHAT_INTERVAL", "10")),
+                    inactivity_interval=int(os.getenv("INACTIVITY_INTERVAL", "600")),
+                )
+            )
+        else:
+            bot.start(
+                interval_seconds=60,
+                inactivity_interval=int(os.getenv("INACTIVITY_INTERVAL", "600")),
+            )
     except ValueError as e:
         logging.critical(f"Ошибка инициализации: {e}")
     except Exception as e:
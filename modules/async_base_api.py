@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from urllib.parse import urlparse
+
+import aiohttp
+
+from .rate_limiter import get_limiter, parse_retry_after
+
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+
+class AsyncBaseAPIClient:
+    def __init__(
+        self,
+        api_key,
+        base_url,
+        auth_scheme="Bearer",
+        host_header=None,
+        timeout=15,
+        pool_size=10,
+        retries=3,
+        backoff_factor=0.5,
+    ):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.headers = self._create_headers(api_key, auth_scheme, host_header)
+        self.rate_limiter = get_limiter(urlparse(base_url).netloc, api_key)
+        # Сессия aiohttp привязана к event loop, поэтому создается лениво
+        self.session = None
+
+    def _create_headers(self, api_key, auth_scheme, host_header):
+        headers = {
+            "Authorization": f"{auth_scheme} {api_key}",
+            "Content-Type": "application/json",
+        }
+
+        if host_header:
+            headers["Host"] = host_header
+
+        return headers
+
+    def _get_session(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size, limit_per_host=self.pool_size, ssl=False
+            )
+            self.session = aiohttp.ClientSession(
+                headers=self.headers, connector=connector, trust_env=False
+            )
+        return self.session
+
+    async def close(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _send(self, method, url, **kwargs):
+        # Совместимость с аргументами requests из синхронного клиента
+        timeout = kwargs.pop("timeout", self.timeout)
+        kwargs.pop("proxies", None)
+        kwargs.pop("verify", None)
+
+        session = self._get_session()
+        delay = self.backoff_factor
+
+        for attempt in range(self.retries + 1):
+            if self.rate_limiter:
+                await self.rate_limiter.acquire_async()
+
+            try:
+                response = await session.request(
+                    method,
+                    url,
+                    timeout=aiohttp.ClientTimeout(total=timeout),
+                    **kwargs,
+                )
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt >= self.retries:
+                    raise
+                logging.warning(f"Ошибка соединения ({e}), повтор через {delay} с")
+                await asyncio.sleep(delay)
+                delay *= 2
+                continue
+
+            if response.status in RETRY_STATUSES and attempt < self.retries:
+                wait = parse_retry_after(response.headers.get("Retry-After"), delay)
+                response.release()
+                logging.warning(
+                    f"Ответ {response.status} от {url}, повтор через {wait} с"
+                )
+                if response.status == 429 and self.rate_limiter:
+                    # Пауза распространяется на всех клиентов этой корзины
+                    self.rate_limiter.penalize(wait)
+                else:
+                    await asyncio.sleep(wait)
+                delay *= 2
+                continue
+
+            return response
+
+    async def _request(self, method, endpoint, **kwargs):
+        url = f"{self.base_url.rstrip('/')}/{endpoint.lstrip('/')}"
+
+        try:
+            logging.info(f"Запрос (async): {method} {url}")
+
+            response = await self._send(method, url, **kwargs)
+            async with response:
+                logging.info(f"Ответ: {response.status}")
+                text = await response.text()
+                if response.status != 200:
+                    logging.info(f"Тело ответа: {text[:200]}...")
+
+                response.raise_for_status()
+
+                if "application/json" in response.headers.get("Content-Type", ""):
+                    return await response.json(content_type=None)
+                return text
+
+        except Exception as e:
+            logging.error(f"Ошибка: {e}")
+            return None
@@ -0,0 +1,23 @@
+import logging
+
+from .async_base_api import AsyncBaseAPIClient
+
+MARKETPLACE_URL = "https://marketplace-api.wildberries.ru/api/v3"
+
+
+class AsyncWBMarketplaceAPI(AsyncBaseAPIClient):
+    def __init__(self, api_key, pool_size=10):
+        super().__init__(api_key=api_key, base_url=MARKETPLACE_URL, pool_size=pool_size)
+        logging.info("AsyncWBMarketplaceAPI инициализирован")
+
+    async def get_new_orders(self):
+        logging.info("Запрос новых заказов через Marketplace API (async)...")
+        data = await self._request("GET", "/orders/new")
+
+        if data and isinstance(data, dict) and "orders" in data:
+            orders = data["orders"]
+            logging.info(f"Получено новых заказов через Marketplace API: {len(orders)}")
+            return orders
+
+        logging.warning("Не удалось получить заказы или список пуст.")
+        return []
@@ -1,51 +1,98 @@
 import logging
+import time
+from urllib.parse import urlparse
 
 import requests
+import urllib3
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from .rate_limiter import get_limiter, parse_retry_after
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+
+def default_retry():
+    return Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[500, 502, 503, 504],
+        allowed_methods=["GET", "POST"],
+        # 429 с Retry-After обрабатывает BaseAPIClient._send: пауза должна
+        # попасть в общую корзину лимитера, а не в sleep внутри urllib3
+        respect_retry_after_header=False,
+    )
+
+
+def create_session(headers=None, pool_size=10, retries=None, trust_env=True):
+    session = requests.Session()
+    session.trust_env = trust_env
+
+    if headers:
+        session.headers.update(headers)
+
+    # Пул keep-alive соединений на хост: повторные запросы не делают
+    # новое TLS-рукопожатие
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=retries if retries is not None else default_retry(),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    session.verify = False
+
+    return session
+
 
 class BaseAPIClient:
     def __init__(
-        self, api_key, base_url, auth_scheme="Bearer", host_header=None, timeout=15
+        self,
+        api_key,
+        base_url,
+        auth_scheme="Bearer",
+        host_header=None,
+        timeout=15,
+        pool_size=10,
     ):
         self.base_url = base_url
         self.timeout = timeout
+        self.pool_size = pool_size
         self.session = self._create_session(api_key, auth_scheme, host_header)
+        self.rate_limiter = get_limiter(urlparse(base_url).netloc, api_key)
+        self.max_throttle_retries = 3
 
     def _create_session(self, api_key, auth_scheme, host_header):
-        session = requests.Session()
-
-        session.trust_env = False
-
-        session.headers.update(
-            {
-                "Authorization": f"{auth_scheme} {api_key}",
-                "Content-Type": "application/json",
-            }
-        )
+        headers = {
+            "Authorization": f"{auth_scheme} {api_key}",
+            "Content-Type": "application/json",
+        }
 
         if host_header:
-            session.headers["Host"] = host_header
+            headers["Host"] = host_header
 
-        retries = Retry(
-            total=3,
-            backoff_factor=0.5,
-            status_forcelist=[500, 502, 503, 504],
-            allowed_methods=["GET", "POST"],
-            respect_retry_after_header=True,
-        )
-        adapter = HTTPAdapter(max_retries=retries)
-        session.mount("http://", adapter)
-        session.mount("https://", adapter)
+        return create_session(headers, pool_size=self.pool_size, trust_env=False)
 
-        session.verify = False
+    def _send(self, method, url, **kwargs):
+        for attempt in range(self.max_throttle_retries + 1):
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
 
-        import urllib3
+            response = self.session.request(method, url, **kwargs)
+
+            if response.status_code != 429 or attempt >= self.max_throttle_retries:
+                return response
 
-        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+            wait = parse_retry_after(response.headers.get("Retry-After"))
+            logging.warning(f"429 от {url}, пауза {wait} с по Retry-After")
+            if self.rate_limiter:
+                # Приостанавливаем всех клиентов, использующих эту корзину
+                self.rate_limiter.penalize(wait)
+            else:
+                time.sleep(wait)
 
-        return session
+        return response
 
     def _request(self, method, endpoint, **kwargs):
         url = f"{self.base_url.rstrip('/')}/{endpoint.lstrip('/')}"
@@ -58,7 +105,7 @@ class BaseAPIClient:
             logging.info(f"Запрос: {method} {url}")
             logging.info(f"Заголовки Host: {self.session.headers.get('Host')}")
 
-            response = self.session.request(method, url, **kwargs)
+            response = self._send(method, url, **kwargs)
 
             logging.info(f"Ответ: {response.status_code}")
             if response.status_code != 200:
@@ -0,0 +1,71 @@
+import time
+
+from .event_index import ChatEventIndex
+
+
+def extract_chats(chats_data):
+    if not chats_data or "result" not in chats_data:
+        return []
+
+    result = chats_data["result"]
+    # Ответ бывает как списком чатов, так и объектом с ключом chats
+    if isinstance(result, dict):
+        result = result.get("chats") or []
+    if not isinstance(result, list):
+        return []
+    return result
+
+
+class ChatHistorySnapshot:
+    def __init__(self, events, chats_data, cursor=None, max_events=20000):
+        self.events = ChatEventIndex(events)
+        self.event_count = len(self.events)
+        self.max_events = max_events
+        # Курсор next, с которого продолжается лента после этого снимка
+        self.cursor = cursor
+        self.chats = {}
+        # Снимок без списка чатов считается устаревшим до первого обновления
+        self.refreshed_at = None
+        if chats_data is not None:
+            self.refresh_chats(chats_data)
+
+    def add_page(self, events, next_cursor):
+        # Страница, которую уже добавил опрос или другое обновление, пропускается
+        if next_cursor and self.cursor and next_cursor <= self.cursor:
+            return False
+
+        if self.event_count + len(events) > self.max_events:
+            # Ограничение памяти: старые события вытесняются целиком
+            self.events = ChatEventIndex()
+            self.event_count = 0
+
+        self.events.add(events)
+        self.event_count += len(events)
+        if next_cursor:
+            self.cursor = next_cursor
+        return True
+
+    def refresh_chats(self, chats_data):
+        # При ошибке запроса списка чатов сохраняются прежние данные
+        chats = extract_chats(chats_data)
+        if chats:
+            self.chats = {chat["chatID"]: chat for chat in chats if chat.get("chatID")}
+        self.refreshed_at = time.monotonic()
+
+    def age(self):
+        if self.refreshed_at is None:
+            return float("inf")
+        return time.monotonic() - self.refreshed_at
+
+    def is_fresh(self, ttl):
+        return self.age() < ttl
+
+    def reply_sign_for(self, chat_id):
+        for event in reversed(self.events.events_for(chat_id)):
+            if event.get("replySign"):
+                return event["replySign"]
+
+        chat = self.chats.get(chat_id)
+        if chat and chat.get("replySign"):
+            return chat["replySign"]
+        return None
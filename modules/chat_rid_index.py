@@ -0,0 +1,37 @@
+import logging
+
+from .lru_cache import LRUCache
+
+SOURCE_GOOD_CARD = "goodCard"
+SOURCE_TEXT = "text"
+SOURCE_CURRENT_EVENTS = "current_events"
+SOURCE_HISTORY = "history"
+
+
+class ChatRidIndex:
+    def __init__(self, db, maxsize=2048):
+        self.db = db
+        self.cache = LRUCache(maxsize=maxsize)
+
+    def get(self, chat_id):
+        rid = self.cache.get(chat_id)
+        if rid:
+            return rid
+
+        row = self.db.get_chat_rid(chat_id)
+        if not row:
+            return None
+
+        rid, found_by, found_at = row
+        logging.info(
+            f"      RID чата {chat_id} загружен из БД: {rid} ({found_by}, {found_at})"
+        )
+        self.cache.put(chat_id, rid)
+        return rid
+
+    def put(self, chat_id, rid, found_by):
+        self.cache.put(chat_id, rid)
+        self.db.save_chat_rid(chat_id, rid, found_by)
+
+    def __contains__(self, chat_id):
+        return self.get(chat_id) is not None
@@ -1,49 +1,67 @@
 import logging
+import posixpath
 import sqlite3
+import threading
+
+from .migrations import run_migrations
 
 
 class DatabaseManager:
     def __init__(self, db_path="wb_orders.db"):
         self.db_path = db_path
         self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        # Соединение общее для всех конвейеров бота (в т.ч. в асинхронном режиме)
+        self.lock = threading.RLock()
+        self.apply_pragmas()
         self.create_tables()
 
-    def create_tables(self):
-        cursor = self.conn.cursor()
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS assembly_tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                rid TEXT UNIQUE,
-                orderUid TEXT,
-                nmId INTEGER,
-                article TEXT,
-                price REAL,
-                createdAt TEXT,
-                status TEXT DEFAULT 'new',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                moved_to_empty INTEGER DEFAULT 0
+    def apply_pragmas(self):
+        with self.lock:
+            cursor = self.conn.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            journal_mode = cursor.fetchone()[0]
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA cache_size=-8000")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.execute("PRAGMA busy_timeout=5000")
+        logging.info(f"Режим журнала SQLite: {journal_mode}")
+
+    def run_maintenance(self):
+        try:
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute("PRAGMA optimize")
+                # PASSIVE не ждет читателей и не блокирует работу бота
+                cursor.execute("PRAGMA wal_checkpoint(PASSIVE)")
+                _, wal_frames, checkpointed = cursor.fetchone()
+            logging.info(
+                f"Обслуживание БД: WAL {wal_frames} страниц, перенесено {checkpointed}"
             )
-        """
-        )
-        self.conn.commit()
-        logging.info("Таблица assembly_tasks создана или уже существует")
+            return True
+        except Exception as e:
+            logging.error(f"Ошибка обслуживания БД: {e}")
+            return False
+
+    def create_tables(self):
+        with self.lock:
+            run_migrations(self.conn)
 
     def add_assembly_task(
         self, rid, orderUid, nmId, article, price, createdAt, status="new"
     ):
         try:
-            cursor = self.conn.cursor()
-            cursor.execute(
-                """
-                INSERT OR REPLACE INTO assembly_tasks
-                (rid, orderUid, nmId, article, price, createdAt, status)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-                (rid, orderUid, nmId, article, price, createdAt, status),
-            )
-            self.conn.commit()
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    """
+                    INSERT OR REPLACE INTO assembly_tasks
+                    (rid, orderUid, nmId, article, price, createdAt, status,
+                     last_activity)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                """,
+                    (rid, orderUid, nmId, article, price, createdAt, status),
+                )
+                self.conn.commit()
             logging.info(
                 f"Сборочное задание (rid: {rid}) обработано и добавлено в базу."
             )
@@ -52,22 +70,124 @@ class DatabaseManager:
             logging.error(f"Ошибка добавления задания в БД: {e}")
             return False
 
+    def add_assembly_tasks_bulk(self, rows):
+        if not rows:
+            return 0
+
+        try:
+            with self.lock:
+                with self.conn:
+                    self.conn.executemany(
+                        """
+                        INSERT OR REPLACE INTO assembly_tasks
+                        (rid, orderUid, nmId, article, price, createdAt, status,
+                         last_activity)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    """,
+                        rows,
+                    )
+            logging.info(f"Пакетно добавлено сборочных заданий: {len(rows)}")
+            return len(rows)
+        except Exception as e:
+            logging.error(f"Ошибка пакетного добавления заданий в БД: {e}")
+            return 0
+
+    def get_existing_rids(self, rids):
+        existing = set()
+        rids = list(rids)
+
+        try:
+            with self.lock:
+                cursor = self.conn.cursor()
+                # SQLite ограничивает число параметров в одном запросе
+                for start in range(0, len(rids), 500):
+                    chunk = rids[start : start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    cursor.execute(
+                        f"SELECT rid FROM assembly_tasks WHERE rid IN ({placeholders})",
+                        chunk,
+                    )
+                    existing.update(row[0] for row in cursor.fetchall())
+            return existing
+        except Exception as e:
+            logging.error(f"Ошибка поиска существующих заданий: {e}")
+            return existing
+
+    def filter_new_orders(self, orders):
+        orders_by_rid = {}
+        for order in orders:
+            order_id = order.get("id")
+            if order_id is not None:
+                orders_by_rid[str(order_id)] = order
+
+        existing = self.get_existing_rids(orders_by_rid.keys())
+        return [
+            order for rid, order in orders_by_rid.items() if rid not in existing
+        ]
+
+    def match_rid_candidates(self, candidates):
+        # Кандидат может быть id заказа, orderUid или RID чата вида xxx.orderUid
+        keys_by_candidate = {}
+        for candidate in candidates:
+            if not candidate:
+                continue
+            keys = {candidate}
+            if "." in candidate:
+                keys.add(candidate.split(".")[-1])
+            keys_by_candidate[candidate] = keys
+
+        all_keys = list(set().union(*keys_by_candidate.values()))
+        if not all_keys:
+            return {}
+
+        try:
+            placeholders = ",".join("?" * len(all_keys))
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    f"""
+                    SELECT rid, orderUid FROM assembly_tasks
+                    WHERE rid IN ({placeholders}) OR orderUid IN ({placeholders})
+                """,
+                    all_keys + all_keys,
+                )
+                rows = cursor.fetchall()
+        except Exception as e:
+            logging.error(f"Ошибка проверки кандидатов RID: {e}")
+            return {}
+
+        by_rid = {row[0]: row[0] for row in rows}
+        by_order_uid = {row[1]: row[0] for row in rows if row[1]}
+
+        matches = {}
+        for candidate, keys in keys_by_candidate.items():
+            if candidate in by_rid:
+                matches[candidate] = by_rid[candidate]
+                continue
+            for key in keys:
+                if key in by_order_uid:
+                    matches[candidate] = by_order_uid[key]
+                    break
+        return matches
+
     def get_task_by_rid(self, rid):
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT * FROM assembly_tasks WHERE rid = ?", (rid,))
-            return cursor.fetchone()
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute("SELECT * FROM assembly_tasks WHERE rid = ?", (rid,))
+                return cursor.fetchone()
         except Exception as e:
             logging.error(f"Ошибка поиска задания по rid: {e}")
             return None
 
     def get_task_by_order_uid(self, order_uid):
         try:
-            cursor = self.conn.cursor()
-            cursor.execute(
-                "SELECT * FROM assembly_tasks WHERE orderUid = ?", (order_uid,)
-            )
-            result = cursor.fetchone()
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    "SELECT * FROM assembly_tasks WHERE orderUid = ?", (order_uid,)
+                )
+                result = cursor.fetchone()
             if result:
                 logging.info(f"Найден заказ по orderUid: {order_uid} -> {result[1]}")
             return result
@@ -77,9 +197,10 @@ class DatabaseManager:
 
     def debug_database(self):
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT * FROM assembly_tasks ORDER BY id DESC LIMIT 5")
-            recent_tasks = cursor.fetchall()
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute("SELECT * FROM assembly_tasks ORDER BY id DESC LIMIT 5")
+                recent_tasks = cursor.fetchall()
 
             logging.info("ДИАГНОСТИКА БАЗЫ ДАННЫХ:")
             for task in recent_tasks:
@@ -89,16 +210,17 @@ class DatabaseManager:
 
     def update_last_activity(self, rid):
         try:
-            cursor = self.conn.cursor()
-            cursor.execute(
-                """
-                UPDATE assembly_tasks 
-                SET last_activity = CURRENT_TIMESTAMP 
-                WHERE rid = ?
-            """,
-                (rid,),
-            )
-            self.conn.commit()
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    """
+                    UPDATE assembly_tasks
+                    SET last_activity = CURRENT_TIMESTAMP
+                    WHERE rid = ?
+                """,
+                    (rid,),
+                )
+                self.conn.commit()
             logging.info(f"Обновлена активность для заказа: {rid}")
             return True
         except Exception as e:
@@ -107,34 +229,493 @@ class DatabaseManager:
 
     def get_inactive_orders(self, hours=24):
         try:
-            cursor = self.conn.cursor()
-            cursor.execute(
-                """
-                SELECT rid, article, createdAt 
-                FROM assembly_tasks 
-                WHERE moved_to_empty = 0 
-                AND datetime(last_activity) < datetime('now', ? || ' hours')
-            """,
-                (f"-{hours}",),
-            )
-            return cursor.fetchall()
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    """
+                    SELECT rid, article, createdAt
+                    FROM assembly_tasks
+                    WHERE moved_to_empty = 0
+                    AND last_activity < datetime('now', ? || ' hours')
+                """,
+                    (f"-{hours}",),
+                )
+                return cursor.fetchall()
         except Exception as e:
             logging.error(f"Ошибка получения неактивных заказов: {e}")
             return []
 
     def mark_as_moved(self, rid):
         try:
-            cursor = self.conn.cursor()
-            cursor.execute(
-                """
-                UPDATE assembly_tasks 
-                SET moved_to_empty = 1 
-                WHERE rid = ?
-            """,
-                (rid,),
-            )
-            self.conn.commit()
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    """
+                    UPDATE assembly_tasks
+                    SET moved_to_empty = 1
+                    WHERE rid = ?
+                """,
+                    (rid,),
+                )
+                self.conn.commit()
             return True
         except Exception as e:
             logging.error(f"Ошибка отметки перемещения: {e}")
             return False
+
+    def mark_as_moved_bulk(self, rids):
+        if not rids:
+            return 0
+
+        try:
+            with self.lock:
+                with self.conn:
+                    self.conn.executemany(
+                        "UPDATE assembly_tasks SET moved_to_empty = 1 WHERE rid = ?",
+                        [(rid,) for rid in rids],
+                    )
+            return len(rids)
+        except Exception as e:
+            logging.error(f"Ошибка пакетной отметки перемещения: {e}")
+            return 0
+
+    def is_known_folder(self, path):
+        try:
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute("SELECT 1 FROM known_folders WHERE path = ?", (path,))
+                return cursor.fetchone() is not None
+        except Exception as e:
+            logging.error(f"Ошибка проверки известной папки: {e}")
+            return False
+
+    def add_known_folder(self, path):
+        try:
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    """
+                    INSERT OR REPLACE INTO known_folders (path, confirmed_at)
+                    VALUES (?, CURRENT_TIMESTAMP)
+                """,
+                    (path,),
+                )
+                self.conn.commit()
+            return True
+        except Exception as e:
+            logging.error(f"Ошибка сохранения известной папки: {e}")
+            return False
+
+    def forget_known_folders(self, path):
+        try:
+            prefix = path.rstrip("/") + "/"
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    """
+                    DELETE FROM known_folders
+                    WHERE path = ? OR substr(path, 1, ?) = ?
+                """,
+                    (path, len(prefix), prefix),
+                )
+                self.conn.commit()
+            return True
+        except Exception as e:
+            logging.error(f"Ошибка удаления известных папок: {e}")
+            return False
+
+    def get_chat_rid(self, chat_id):
+        try:
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    "SELECT rid, found_by, found_at FROM chat_rids WHERE chat_id = ?",
+                    (chat_id,),
+                )
+                return cursor.fetchone()
+        except Exception as e:
+            logging.error(f"Ошибка поиска RID чата: {e}")
+            return None
+
+    def save_chat_rid(self, chat_id, rid, found_by):
+        try:
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    """
+                    INSERT OR REPLACE INTO chat_rids (chat_id, rid, found_by, found_at)
+                    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                """,
+                    (chat_id, rid, found_by),
+                )
+                self.conn.commit()
+            return True
+        except Exception as e:
+            logging.error(f"Ошибка сохранения RID чата: {e}")
+            return False
+
+    def get_state(self, key, default=None):
+        try:
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute("SELECT value FROM bot_state WHERE key = ?", (key,))
+                row = cursor.fetchone()
+            return row[0] if row else default
+        except Exception as e:
+            logging.error(f"Ошибка чтения состояния '{key}': {e}")
+            return default
+
+    def set_state(self, key, value):
+        try:
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    """
+                    INSERT OR REPLACE INTO bot_state (key, value, updated_at)
+                    VALUES (?, ?, CURRENT_TIMESTAMP)
+                """,
+                    (key, str(value)),
+                )
+                self.conn.commit()
+            return True
+        except Exception as e:
+            logging.error(f"Ошибка сохранения состояния '{key}': {e}")
+            return False
+
+    def is_event_processed(self, event_id):
+        try:
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    "SELECT 1 FROM processed_events WHERE event_id = ?", (event_id,)
+                )
+                return cursor.fetchone() is not None
+        except Exception as e:
+            logging.error(f"Ошибка проверки обработанного события: {e}")
+            return False
+
+    def mark_event_processed(self, event_id, processed_at):
+        try:
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    """
+                    INSERT OR IGNORE INTO processed_events (event_id, processed_at)
+                    VALUES (?, ?)
+                """,
+                    (event_id, processed_at),
+                )
+                self.conn.commit()
+            return True
+        except Exception as e:
+            logging.error(f"Ошибка отметки обработанного события: {e}")
+            return False
+
+    def prune_processed_events(self, older_than, max_entries):
+        try:
+            with self.lock:
+                with self.conn:
+                    cursor = self.conn.cursor()
+                    cursor.execute(
+                        "DELETE FROM processed_events WHERE processed_at < ?",
+                        (older_than,),
+                    )
+                    removed = cursor.rowcount
+                    # Ограничиваем размер хранилища как кольцевого буфера
+                    cursor.execute(
+                        """
+                        DELETE FROM processed_events
+                        WHERE processed_at < (
+                            SELECT processed_at FROM processed_events
+                            ORDER BY processed_at DESC
+                            LIMIT 1 OFFSET ?
+                        )
+                    """,
+                        (max_entries - 1,),
+                    )
+                    removed += cursor.rowcount
+            if removed:
+                logging.info(f"Удалено устаревших обработанных событий: {removed}")
+            return removed
+        except Exception as e:
+            logging.error(f"Ошибка очистки обработанных событий: {e}")
+            return 0
+
+    def get_reply_sign(self, chat_id):
+        try:
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    "SELECT reply_sign FROM reply_signs WHERE chat_id = ?", (chat_id,)
+                )
+                row = cursor.fetchone()
+            return row[0] if row else None
+        except Exception as e:
+            logging.error(f"Ошибка поиска replySign: {e}")
+            return None
+
+    def save_reply_signs(self, pairs):
+        if not pairs:
+            return 0
+
+        try:
+            with self.lock:
+                with self.conn:
+                    self.conn.executemany(
+                        """
+                        INSERT OR REPLACE INTO reply_signs
+                        (chat_id, reply_sign, updated_at)
+                        VALUES (?, ?, CURRENT_TIMESTAMP)
+                    """,
+                        pairs,
+                    )
+            return len(pairs)
+        except Exception as e:
+            logging.error(f"Ошибка сохранения replySign: {e}")
+            return 0
+
+    def enqueue_outbox(self, message_id, kind, chat_id, rid, text, reply_sign):
+        try:
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    """
+                    INSERT OR IGNORE INTO outbox
+                    (message_id, kind, chat_id, rid, text, reply_sign)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                    (message_id, kind, chat_id, rid, text, reply_sign),
+                )
+                self.conn.commit()
+                return cursor.rowcount > 0
+        except Exception as e:
+            logging.error(f"Ошибка постановки сообщения в очередь: {e}")
+            return False
+
+    def chat_has_outbox_message(self, chat_id, kind):
+        try:
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    """
+                    SELECT 1 FROM outbox
+                    WHERE chat_id = ? AND kind = ? AND state != 'failed'
+                    LIMIT 1
+                """,
+                    (chat_id, kind),
+                )
+                return cursor.fetchone() is not None
+        except Exception as e:
+            logging.error(f"Ошибка проверки очереди сообщений: {e}")
+            return False
+
+    def claim_outbox_batch(self, now, limit=10):
+        try:
+            with self.lock:
+                with self.conn:
+                    cursor = self.conn.cursor()
+                    cursor.execute(
+                        """
+                        SELECT id, message_id, chat_id, text, reply_sign, attempts
+                        FROM outbox
+                        WHERE state = 'pending' AND next_attempt_at <= ?
+                        ORDER BY id
+                        LIMIT ?
+                    """,
+                        (now, limit),
+                    )
+                    rows = cursor.fetchall()
+                    cursor.executemany(
+                        "UPDATE outbox SET state = 'sending' WHERE id = ?",
+                        [(row[0],) for row in rows],
+                    )
+            return rows
+        except Exception as e:
+            logging.error(f"Ошибка выборки сообщений из очереди: {e}")
+            return []
+
+    def mark_outbox_sent(self, outbox_id):
+        try:
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    """
+                    UPDATE outbox
+                    SET state = 'sent', attempts = attempts + 1,
+                        sent_at = CURRENT_TIMESTAMP, last_error = NULL
+                    WHERE id = ?
+                """,
+                    (outbox_id,),
+                )
+                self.conn.commit()
+            return True
+        except Exception as e:
+            logging.error(f"Ошибка отметки отправленного сообщения: {e}")
+            return False
+
+    def mark_outbox_retry(self, outbox_id, error, next_attempt_at, final=False):
+        try:
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    """
+                    UPDATE outbox
+                    SET state = ?, attempts = attempts + 1,
+                        next_attempt_at = ?, last_error = ?
+                    WHERE id = ?
+                """,
+                    ("failed" if final else "pending", next_attempt_at, error, outbox_id),
+                )
+                self.conn.commit()
+            return True
+        except Exception as e:
+            logging.error(f"Ошибка отметки неудачной отправки: {e}")
+            return False
+
+    def reset_stuck_outbox(self):
+        try:
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    "UPDATE outbox SET state = 'pending' WHERE state = 'sending'"
+                )
+                self.conn.commit()
+                return cursor.rowcount
+        except Exception as e:
+            logging.error(f"Ошибка восстановления очереди сообщений: {e}")
+            return 0
+
+    def add_media_job(self, source_url, disk_path, state="pending"):
+        # Возвращает (id задания, создано ли новое); id None - ошибка БД
+        folder = posixpath.dirname(disk_path)
+        try:
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    """
+                    INSERT OR IGNORE INTO media_jobs
+                    (source_url, folder, disk_path, state)
+                    VALUES (?, ?, ?, ?)
+                """,
+                    (source_url, folder, disk_path, state),
+                )
+                self.conn.commit()
+                if cursor.rowcount > 0:
+                    return cursor.lastrowid, True
+
+                cursor.execute(
+                    "SELECT id FROM media_jobs WHERE source_url = ? AND folder = ?",
+                    (source_url, folder),
+                )
+                row = cursor.fetchone()
+                return (row[0] if row else None), False
+        except Exception as e:
+            logging.error(f"Ошибка добавления задания передачи медиа: {e}")
+            return None, False
+
+    def claim_media_jobs(self, now, limit=20):
+        try:
+            with self.lock:
+                with self.conn:
+                    cursor = self.conn.cursor()
+                    cursor.execute(
+                        """
+                        SELECT id, source_url, disk_path, attempts
+                        FROM media_jobs
+                        WHERE state = 'pending' AND next_attempt_at <= ?
+                        ORDER BY id
+                        LIMIT ?
+                    """,
+                        (now, limit),
+                    )
+                    rows = cursor.fetchall()
+                    cursor.executemany(
+                        """
+                        UPDATE media_jobs
+                        SET state = 'running', updated_at = CURRENT_TIMESTAMP
+                        WHERE id = ?
+                    """,
+                        [(row[0],) for row in rows],
+                    )
+            return rows
+        except Exception as e:
+            logging.error(f"Ошибка выборки заданий передачи медиа: {e}")
+            return []
+
+    def finish_media_job(self, job_id, state, error=None, next_attempt_at=0):
+        try:
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    """
+                    UPDATE media_jobs
+                    SET state = ?, attempts = attempts + 1, last_error = ?,
+                        next_attempt_at = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                """,
+                    (state, error, next_attempt_at, job_id),
+                )
+                self.conn.commit()
+            return True
+        except Exception as e:
+            logging.error(f"Ошибка обновления задания передачи медиа: {e}")
+            return False
+
+    def reset_running_media_jobs(self):
+        try:
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    "UPDATE media_jobs SET state = 'pending' WHERE state = 'running'"
+                )
+                self.conn.commit()
+                return cursor.rowcount
+        except Exception as e:
+            logging.error(f"Ошибка восстановления заданий передачи медиа: {e}")
+            return 0
+
+    def get_media_by_hash(self, folder, sha256):
+        try:
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    "SELECT disk_path FROM media_hashes WHERE folder = ? AND sha256 = ?",
+                    (folder, sha256),
+                )
+                row = cursor.fetchone()
+            return row[0] if row else None
+        except Exception as e:
+            logging.error(f"Ошибка поиска хэша медиа: {e}")
+            return None
+
+    def save_media_hash(self, folder, sha256, disk_path):
+        try:
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    """
+                    INSERT OR IGNORE INTO media_hashes (folder, sha256, disk_path)
+                    VALUES (?, ?, ?)
+                """,
+                    (folder, sha256, disk_path),
+                )
+                self.conn.commit()
+            return True
+        except Exception as e:
+            logging.error(f"Ошибка сохранения хэша медиа: {e}")
+            return False
+
+    def get_queue_stats(self):
+        stats = {}
+        try:
+            with self.lock:
+                cursor = self.conn.cursor()
+                for table in ("outbox", "media_jobs"):
+                    cursor.execute(
+                        f"SELECT state, COUNT(*) FROM {table} GROUP BY state"
+                    )
+                    stats[table] = dict(cursor.fetchall())
+            return stats
+        except Exception as e:
+            logging.error(f"Ошибка получения статистики очередей: {e}")
+            return stats
@@ -0,0 +1,36 @@
+class ChatEventIndex:
+    def __init__(self, events=None):
+        self.events_by_chat = {}
+        self.good_cards = {}
+        if events:
+            self.add(events)
+
+    def add(self, events):
+        for event in events:
+            chat_id = event.get("chatID")
+            if not chat_id:
+                continue
+
+            self.events_by_chat.setdefault(chat_id, []).append(event)
+
+            # Запоминаем первую карточку товара с RID, как и при линейном поиске
+            if chat_id in self.good_cards:
+                continue
+            message_data = event.get("message") or {}
+            if not isinstance(message_data, dict):
+                continue
+            attachments = message_data.get("attachments") or {}
+            if not isinstance(attachments, dict):
+                continue
+            good_card = attachments.get("goodCard")
+            if good_card and good_card.get("rid"):
+                self.good_cards[chat_id] = good_card
+
+    def events_for(self, chat_id):
+        return self.events_by_chat.get(chat_id, [])
+
+    def good_card_for(self, chat_id):
+        return self.good_cards.get(chat_id)
+
+    def __len__(self):
+        return sum(len(events) for events in self.events_by_chat.values())
@@ -0,0 +1,108 @@
+import logging
+import threading
+import time
+
+
+class MediaJobQueue:
+    def __init__(
+        self,
+        db,
+        pool,
+        poll_interval=10,
+        batch_size=20,
+        max_attempts=6,
+        base_delay=30,
+        max_delay=3600,
+    ):
+        self.db = db
+        self.pool = pool
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._stop = threading.Event()
+        self._thread = None
+
+    def submit(self, source_url, disk_path):
+        # Задание сначала фиксируется в БД, затем сразу отправляется в пул;
+        # при неудаче его подхватит фоновый поток по расписанию повторов
+        job_id, created = self.db.add_media_job(source_url, disk_path, state="running")
+        if job_id is None:
+            # Без записи в БД вложение не теряется: передаем его напрямую,
+            # но уже без повторов по расписанию
+            logging.error(
+                f"      Не удалось поставить {disk_path} в очередь, передача без повторов"
+            )
+            return self.pool.submit(source_url, disk_path)
+        if not created:
+            logging.info(
+                f"      Вложение уже в очереди (задание #{job_id}), {disk_path} пропущен"
+            )
+            return None
+        return self._dispatch(job_id, source_url, disk_path, attempts=0)
+
+    def _dispatch(self, job_id, source_url, disk_path, attempts):
+        future = self.pool.submit(source_url, disk_path)
+        future.add_done_callback(
+            lambda done: self._on_done(job_id, disk_path, attempts, done)
+        )
+        return future
+
+    def _on_done(self, job_id, disk_path, attempts, future):
+        try:
+            result = future.result()
+            success, error = result.success, result.error
+        except Exception as e:
+            success, error = False, str(e)
+
+        if success:
+            self.db.finish_media_job(job_id, "done")
+            return
+
+        attempts += 1
+        if attempts >= self.max_attempts:
+            self.db.finish_media_job(job_id, "failed", error)
+            logging.error(
+                f"Передача {disk_path} не удалась после {attempts} попыток: {error}"
+            )
+            return
+
+        delay = min(self.base_delay * 2 ** (attempts - 1), self.max_delay)
+        self.db.finish_media_job(job_id, "pending", error, int(time.time() + delay))
+        logging.warning(f"Передача {disk_path} не удалась ({error}), повтор через {delay} с")
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+
+        restored = self.db.reset_running_media_jobs()
+        if restored:
+            logging.info(f"Возобновлено незавершенных передач медиа: {restored}")
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="media-jobs", daemon=True
+        )
+        self._thread.start()
+        logging.info("Обработчик очереди передачи медиа запущен")
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.dispatch_due()
+            except Exception as e:
+                logging.error(f"Ошибка обработчика очереди медиа: {e}")
+            self._stop.wait(self.poll_interval)
+
+    def dispatch_due(self):
+        rows = self.db.claim_media_jobs(int(time.time()), self.batch_size)
+        for job_id, source_url, disk_path, attempts in rows:
+            logging.info(f"Повтор передачи медиа {disk_path} (попытка {attempts + 1})")
+            self._dispatch(job_id, source_url, disk_path, attempts)
+        return len(rows)
@@ -0,0 +1,202 @@
+import hashlib
+import logging
+import posixpath
+import tempfile
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from .base_api import create_session
+
+TransferResult = namedtuple(
+    "TransferResult",
+    ["source_url", "disk_path", "success", "error", "duplicate_of"],
+    defaults=(None,),
+)
+
+
+class MediaTransferPool:
+    def __init__(
+        self,
+        disk,
+        max_workers=8,
+        per_host_limit=4,
+        upload_host=None,
+        streaming=False,
+        chunk_size=64 * 1024,
+        hash_store=None,
+        spool_size=1024 * 1024,
+    ):
+        self.disk = disk
+        # Индекс SHA-256 содержимого по папкам заказа (таблица media_hashes)
+        self.hash_store = hash_store
+        self.spool_size = spool_size
+        self.per_host_limit = per_host_limit
+        self.streaming = streaming
+        self.chunk_size = chunk_size
+        self.upload_host = upload_host or urlparse(disk.base_url).netloc
+        # Общий пул соединений к CDN WB вместо нового TLS-соединения на файл
+        self.session = create_session(pool_size=max(max_workers, per_host_limit))
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="media"
+        )
+        self._host_slots = {}
+        self._host_slots_lock = threading.Lock()
+        logging.info(
+            f"Пул передачи медиа: {max_workers} потоков, до {per_host_limit} на хост, "
+            f"потоковый режим: {streaming} (блок {chunk_size} байт)"
+        )
+
+    def _slot(self, host):
+        with self._host_slots_lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(
+                    self.per_host_limit
+                )
+            return self._host_slots[host]
+
+    def submit(self, source_url, disk_path):
+        return self.executor.submit(self._transfer, source_url, disk_path)
+
+    def _transfer(self, source_url, disk_path):
+        if self.streaming:
+            return self._transfer_streaming(source_url, disk_path)
+
+        try:
+            with self._slot(urlparse(source_url).netloc):
+                response = self.session.get(source_url, timeout=30)
+
+            if response.status_code != 200:
+                return TransferResult(
+                    source_url,
+                    disk_path,
+                    False,
+                    f"Ошибка скачивания: {response.status_code}",
+                )
+
+            logging.info(
+                f"      Скачано {len(response.content)} байт для {disk_path}"
+            )
+
+            digest = hashlib.sha256(response.content).hexdigest()
+            duplicate = self._find_duplicate(disk_path, digest)
+            if duplicate:
+                return TransferResult(source_url, disk_path, True, None, duplicate)
+
+            with self._slot(self.upload_host):
+                success = self.disk.upload_file_from_memory(
+                    response.content, disk_path
+                )
+
+            if not success:
+                return TransferResult(
+                    source_url, disk_path, False, "Ошибка загрузки на Яндекс.Диск"
+                )
+            self._remember_hash(disk_path, digest)
+            return TransferResult(source_url, disk_path, True, None)
+
+        except Exception as e:
+            return TransferResult(source_url, disk_path, False, str(e))
+
+    def _find_duplicate(self, disk_path, digest):
+        if not self.hash_store:
+            return None
+
+        duplicate = self.hash_store.get_media_by_hash(
+            posixpath.dirname(disk_path), digest
+        )
+        if duplicate:
+            logging.info(
+                f"      Пропуск {disk_path}: такой же файл уже загружен как {duplicate}"
+            )
+        return duplicate
+
+    def _remember_hash(self, disk_path, digest):
+        if self.hash_store:
+            self.hash_store.save_media_hash(
+                posixpath.dirname(disk_path), digest, disk_path
+            )
+
+    def _transfer_streaming(self, source_url, disk_path):
+        if self.hash_store:
+            return self._transfer_spooled(source_url, disk_path)
+
+        try:
+            with self._slot(urlparse(source_url).netloc):
+                with self.session.get(
+                    source_url, timeout=30, stream=True
+                ) as response:
+                    if response.status_code != 200:
+                        return TransferResult(
+                            source_url,
+                            disk_path,
+                            False,
+                            f"Ошибка скачивания: {response.status_code}",
+                        )
+
+                    with self._slot(self.upload_host):
+                        success = self.disk.upload_stream(
+                            response.iter_content(chunk_size=self.chunk_size),
+                            disk_path,
+                        )
+
+            if not success:
+                return TransferResult(
+                    source_url, disk_path, False, "Ошибка загрузки на Яндекс.Диск"
+                )
+            return TransferResult(source_url, disk_path, True, None)
+
+        except Exception as e:
+            return TransferResult(source_url, disk_path, False, str(e))
+
+    def _transfer_spooled(self, source_url, disk_path):
+        # Хэш нужен до начала загрузки, поэтому поток с CDN сначала
+        # сбрасывается во временный файл (в памяти до spool_size байт)
+        try:
+            with tempfile.SpooledTemporaryFile(max_size=self.spool_size) as spool:
+                hasher = hashlib.sha256()
+
+                with self._slot(urlparse(source_url).netloc):
+                    with self.session.get(
+                        source_url, timeout=30, stream=True
+                    ) as response:
+                        if response.status_code != 200:
+                            return TransferResult(
+                                source_url,
+                                disk_path,
+                                False,
+                                f"Ошибка скачивания: {response.status_code}",
+                            )
+
+                        for chunk in response.iter_content(chunk_size=self.chunk_size):
+                            hasher.update(chunk)
+                            spool.write(chunk)
+
+                logging.info(f"      Скачано {spool.tell()} байт для {disk_path}")
+
+                digest = hasher.hexdigest()
+                duplicate = self._find_duplicate(disk_path, digest)
+                if duplicate:
+                    return TransferResult(
+                        source_url, disk_path, True, None, duplicate
+                    )
+
+                spool.seek(0)
+                with self._slot(self.upload_host):
+                    success = self.disk.upload_stream(
+                        iter(lambda: spool.read(self.chunk_size), b""), disk_path
+                    )
+
+            if not success:
+                return TransferResult(
+                    source_url, disk_path, False, "Ошибка загрузки на Яндекс.Диск"
+                )
+            self._remember_hash(disk_path, digest)
+            return TransferResult(source_url, disk_path, True, None)
+
+        except Exception as e:
+            return TransferResult(source_url, disk_path, False, str(e))
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
@@ -0,0 +1,306 @@
+import logging
+
+
+def _create_assembly_tasks(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS assembly_tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            rid TEXT UNIQUE,
+            orderUid TEXT,
+            nmId INTEGER,
+            article TEXT,
+            price REAL,
+            createdAt TEXT,
+            status TEXT DEFAULT 'new',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            moved_to_empty INTEGER DEFAULT 0
+        )
+    """
+    )
+
+
+def _add_activity_columns(cursor):
+    # В старых копиях БД нет колонок для отслеживания активности
+    cursor.execute("PRAGMA table_info(assembly_tasks)")
+    columns = {row[1] for row in cursor.fetchall()}
+    if "last_activity" not in columns:
+        # ALTER TABLE не допускает DEFAULT CURRENT_TIMESTAMP
+        cursor.execute("ALTER TABLE assembly_tasks ADD COLUMN last_activity TIMESTAMP")
+        cursor.execute(
+            """
+            UPDATE assembly_tasks
+            SET last_activity = COALESCE(created_at, CURRENT_TIMESTAMP)
+        """
+        )
+    if "moved_to_empty" not in columns:
+        cursor.execute(
+            "ALTER TABLE assembly_tasks ADD COLUMN moved_to_empty INTEGER DEFAULT 0"
+        )
+
+
+def _create_known_folders(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS known_folders (
+            path TEXT PRIMARY KEY,
+            confirmed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """
+    )
+
+
+def _index_order_uid(cursor):
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_assembly_tasks_order_uid
+        ON assembly_tasks (orderUid)
+    """
+    )
+
+
+def _index_inactive(cursor):
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_assembly_tasks_inactive
+        ON assembly_tasks (moved_to_empty, last_activity)
+    """
+    )
+
+
+def _create_chat_rids(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS chat_rids (
+            chat_id TEXT PRIMARY KEY,
+            rid TEXT NOT NULL,
+            found_by TEXT,
+            found_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """
+    )
+
+
+def _create_bot_state(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS bot_state (
+            key TEXT PRIMARY KEY,
+            value TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """
+    )
+
+
+def _create_processed_events(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS processed_events (
+            event_id TEXT PRIMARY KEY,
+            processed_at INTEGER NOT NULL
+        )
+    """
+    )
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_processed_events_processed_at
+        ON processed_events (processed_at)
+    """
+    )
+
+
+def _create_reply_signs(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS reply_signs (
+            chat_id TEXT PRIMARY KEY,
+            reply_sign TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """
+    )
+
+
+def _create_outbox(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            message_id TEXT UNIQUE NOT NULL,
+            kind TEXT NOT NULL,
+            chat_id TEXT NOT NULL,
+            rid TEXT,
+            text TEXT NOT NULL,
+            reply_sign TEXT,
+            state TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            sent_at TIMESTAMP
+        )
+    """
+    )
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_outbox_due
+        ON outbox (state, next_attempt_at)
+    """
+    )
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_outbox_chat
+        ON outbox (chat_id, kind)
+    """
+    )
+
+
+def _create_media_jobs(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS media_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source_url TEXT NOT NULL,
+            disk_path TEXT UNIQUE NOT NULL,
+            state TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """
+    )
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_media_jobs_due
+        ON media_jobs (state, next_attempt_at)
+    """
+    )
+
+
+def _create_media_hashes(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS media_hashes (
+            folder TEXT NOT NULL,
+            sha256 TEXT NOT NULL,
+            disk_path TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (folder, sha256)
+        )
+    """
+    )
+
+
+def _backfill_last_activity(cursor):
+    # Колонка, добавленная через ALTER TABLE, не имеет DEFAULT: заказы,
+    # вставленные после миграции #2, остались с last_activity = NULL
+    cursor.execute(
+        """
+        UPDATE assembly_tasks
+        SET last_activity = COALESCE(created_at, CURRENT_TIMESTAMP)
+        WHERE last_activity IS NULL
+    """
+    )
+
+
+def _add_media_job_folder(cursor):
+    # Имя файла содержит метку времени, поэтому повторно доставленное вложение
+    # узнается по паре (источник, папка заказа), а не по disk_path
+    cursor.execute("PRAGMA table_info(media_jobs)")
+    columns = {row[1] for row in cursor.fetchall()}
+    if "folder" not in columns:
+        cursor.execute("ALTER TABLE media_jobs ADD COLUMN folder TEXT")
+    cursor.execute(
+        """
+        UPDATE media_jobs
+        SET folder = RTRIM(RTRIM(disk_path, REPLACE(disk_path, '/', '')), '/')
+        WHERE folder IS NULL
+    """
+    )
+    cursor.execute(
+        """
+        DELETE FROM media_jobs
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM media_jobs GROUP BY source_url, folder
+        )
+    """
+    )
+    cursor.execute(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_media_jobs_source
+        ON media_jobs (source_url, folder)
+    """
+    )
+
+
+# Порядок и номера версий менять нельзя: новые шаги добавляются только в конец.
+# Каждый шаг идемпотентен, чтобы его можно было применить к любой из
+# разошедшихся копий БД. Индексы строятся отдельными короткими шагами,
+# чтобы в режиме WAL читатели не блокировались надолго.
+MIGRATIONS = [
+    (1, "Таблица assembly_tasks", _create_assembly_tasks),
+    (2, "Колонки last_activity и moved_to_empty", _add_activity_columns),
+    (3, "Таблица known_folders", _create_known_folders),
+    (4, "Индекс assembly_tasks.orderUid", _index_order_uid),
+    (5, "Индекс неактивных заказов", _index_inactive),
+    (6, "Таблица chat_rids", _create_chat_rids),
+    (7, "Таблица bot_state", _create_bot_state),
+    (8, "Таблица processed_events", _create_processed_events),
+    (9, "Таблица reply_signs", _create_reply_signs),
+    (10, "Очередь исходящих сообщений outbox", _create_outbox),
+    (11, "Очередь передачи медиа media_jobs", _create_media_jobs),
+    (12, "Хэши содержимого медиа media_hashes", _create_media_hashes),
+    (13, "Заполнение пустых last_activity", _backfill_last_activity),
+    (14, "Ключ источника и папки для media_jobs", _add_media_job_folder),
+]
+
+
+def get_schema_version(conn):
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """
+    )
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    return cursor.fetchone()[0]
+
+
+def run_migrations(conn):
+    current_version = get_schema_version(conn)
+    applied = 0
+
+    for version, description, step in MIGRATIONS:
+        if version <= current_version:
+            continue
+
+        cursor = conn.cursor()
+        cursor.execute("BEGIN")
+        try:
+            step(cursor)
+            cursor.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (version, description),
+            )
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"Ошибка миграции #{version} ({description}): {e}")
+            raise
+
+        applied += 1
+        logging.info(f"Применена миграция #{version}: {description}")
+
+    if applied:
+        logging.info(f"Схема БД обновлена до версии {MIGRATIONS[-1][0]}")
+    else:
+        logging.info(f"Схема БД актуальна (версия {current_version})")
+    return applied
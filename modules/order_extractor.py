@@ -0,0 +1,56 @@
+import re
+
+# Порядок задает приоритет: при нескольких совпадениях в тексте выигрывает
+# тип, стоящий выше. Новые шаблоны добавляются сюда же
+ORDER_PATTERNS = [
+    ("order_keyword", r"заказ[:\s]*(?P<order_keyword>[A-Z0-9]{10,})"),
+    ("assembly_keyword", r"сборочное[:\s]*(?P<assembly_keyword>[A-Z0-9]{10,})"),
+    ("short_code", r"\b(?P<short_code>[A-Z]{2,3}\d{7,9})\b"),
+    ("number_keyword", r"номер[:\s]*(?P<number_keyword>[A-Z0-9]{10,})"),
+    ("order_en", r"order[:\s]*(?P<order_en>[A-Z0-9]{10,})"),
+    ("day_rid", r"DAy\.(?P<day_rid>[a-f0-9]{32})"),
+    (
+        "uuid",
+        r"(?P<uuid>[a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12})",
+    ),
+]
+
+# Каждый шаблон компилируется отдельно: в общей альтернации совпадение
+# одного типа поглощает текст и скрывает перекрывающиеся совпадения других
+COMPILED_PATTERNS = [
+    (kind, re.compile(pattern, re.IGNORECASE)) for kind, pattern in ORDER_PATTERNS
+]
+
+# Любой номер содержит подряд не менее 7 букв или цифр: тексты без такой
+# последовательности (большинство сообщений) отсекаются одним поиском
+CANDIDATE_RUN = re.compile(r"[A-Z\d]{7}", re.IGNORECASE)
+
+# Обязательные фрагменты шаблонов; проверяются по casefold(), который
+# покрывает все регистровые эквиваленты re.IGNORECASE для этих символов
+PATTERN_MARKERS = {
+    "order_keyword": "заказ",
+    "assembly_keyword": "сборочное",
+    "number_keyword": "номер",
+    "order_en": "order",
+    "day_rid": "day.",
+    "uuid": "-",
+}
+
+
+def extract_order_candidates(text):
+    if not text or not CANDIDATE_RUN.search(text):
+        return []
+
+    folded = text.casefold()
+    candidates = []
+    seen = set()
+    for kind, pattern in COMPILED_PATTERNS:
+        marker = PATTERN_MARKERS.get(kind)
+        if marker and marker not in folded:
+            continue
+        for match in pattern.finditer(text):
+            candidate = (match.group(kind), kind)
+            if candidate not in seen:
+                seen.add(candidate)
+                candidates.append(candidate)
+    return candidates
@@ -0,0 +1,97 @@
+import logging
+import threading
+import time
+import uuid
+
+KIND_WELCOME = "welcome"
+
+
+class OutboxWorker:
+    def __init__(
+        self,
+        db,
+        chat_api,
+        poll_interval=2,
+        batch_size=10,
+        max_attempts=5,
+        base_delay=5,
+        max_delay=600,
+    ):
+        self.db = db
+        self.chat_api = chat_api
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._stop = threading.Event()
+        self._thread = None
+
+    def enqueue(self, kind, chat_id, rid, text, reply_sign=None):
+        # id из payload служит ключом идемпотентности: повторная доставка
+        # той же записи после сбоя отправляет тот же идентификатор
+        message_id = str(uuid.uuid4())
+        if self.db.enqueue_outbox(message_id, kind, chat_id, rid, text, reply_sign):
+            logging.info(f"Сообщение {message_id} для чата {chat_id} поставлено в очередь")
+            return message_id
+        return None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+
+        restored = self.db.reset_stuck_outbox()
+        if restored:
+            logging.info(f"Возвращено в очередь незавершенных отправок: {restored}")
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="outbox", daemon=True
+        )
+        self._thread.start()
+        logging.info("Обработчик очереди исходящих сообщений запущен")
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                sent = self.drain_once()
+            except Exception as e:
+                logging.error(f"Ошибка обработчика очереди сообщений: {e}")
+                sent = 0
+            if not sent:
+                self._stop.wait(self.poll_interval)
+
+    def drain_once(self):
+        rows = self.db.claim_outbox_batch(int(time.time()), self.batch_size)
+
+        for outbox_id, message_id, chat_id, text, reply_sign, attempts in rows:
+            success = self.chat_api.send_message(
+                chat_id, text, reply_sign, message_id=message_id
+            )
+
+            if success:
+                self.db.mark_outbox_sent(outbox_id)
+                logging.info(f"Автоответ отправлен в чат {chat_id}")
+                continue
+
+            attempts += 1
+            final = attempts >= self.max_attempts
+            delay = min(self.base_delay * 2 ** (attempts - 1), self.max_delay)
+            self.db.mark_outbox_retry(
+                outbox_id, "send_message failed", int(time.time() + delay), final
+            )
+            if final:
+                logging.error(
+                    f"Не удалось отправить сообщение в чат {chat_id} за {attempts} попыток"
+                )
+            else:
+                logging.warning(
+                    f"Не удалось отправить сообщение в чат {chat_id}, повтор через {delay} с"
+                )
+
+        return len(rows)
@@ -0,0 +1,31 @@
+import time
+
+from .lru_cache import LRUCache
+
+
+class ProcessedEventStore:
+    def __init__(self, db, window_hours=72, max_entries=50000, memory_size=5000):
+        self.db = db
+        self.window_hours = window_hours
+        self.max_entries = max_entries
+        self.recent = LRUCache(maxsize=memory_size)
+
+    def __contains__(self, event_id):
+        if event_id is None:
+            return False
+        if event_id in self.recent:
+            return True
+        if self.db.is_event_processed(event_id):
+            self.recent.put(event_id)
+            return True
+        return False
+
+    def add(self, event_id):
+        if event_id is None:
+            return
+        self.recent.put(event_id)
+        self.db.mark_event_processed(event_id, int(time.time() * 1000))
+
+    def prune(self):
+        cutoff = int((time.time() - self.window_hours * 3600) * 1000)
+        return self.db.prune_processed_events(cutoff, self.max_entries)
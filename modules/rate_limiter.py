@@ -0,0 +1,92 @@
+import asyncio
+import hashlib
+import threading
+import time
+
+# Лимиты WB API: (запросов в секунду, размер всплеска)
+WB_HOST_LIMITS = {
+    "marketplace-api.wildberries.ru": (300 / 60, 20),
+    "buyer-chat-api.wildberries.ru": (10 / 10, 10),
+}
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        # Момент, с которого копятся жетоны; после penalize он в будущем
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        if now <= self.updated:
+            return
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        # Жетон резервируется сразу (баланс может уйти в минус), а вызывающий
+        # ждет возвращенное время: так запросы выстраиваются в очередь
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            wait = max(0.0, self.updated - now)
+            if self.tokens < 0:
+                wait += -self.tokens / self.rate
+            return wait
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def penalize(self, seconds):
+        # Пополнение начинается только по окончании паузы: после нее проходит
+        # один запрос, следующие снова идут с интервалом 1/rate
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.updated = max(self.updated, now + seconds)
+            self.tokens = min(self.tokens, 1)
+
+
+def configure_limit(host, rate, burst):
+    WB_HOST_LIMITS[host] = (rate, burst)
+
+
+def get_limiter(host, api_key):
+    limits = WB_HOST_LIMITS.get(host)
+    if not limits:
+        return None
+
+    # Лимиты WB считаются на токен продавца, поэтому корзина общая
+    # для всех клиентов с одинаковым хостом и ключом
+    key_hash = hashlib.sha256(str(api_key).encode()).hexdigest()[:16]
+    with _limiters_lock:
+        limiter = _limiters.get((host, key_hash))
+        if limiter is None:
+            rate, burst = limits
+            limiter = TokenBucket(rate, burst)
+            _limiters[(host, key_hash)] = limiter
+        return limiter
+
+
+def parse_retry_after(value, default=1.0):
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return default
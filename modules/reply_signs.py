@@ -0,0 +1,38 @@
+import threading
+
+
+class ReplySignCache:
+    def __init__(self, store=None):
+        self.store = store
+        self._signs = {}
+        self._lock = threading.Lock()
+
+    def remember(self, items):
+        changed = []
+        with self._lock:
+            for item in items:
+                chat_id = item.get("chatID")
+                reply_sign = item.get("replySign")
+                if not chat_id or not reply_sign:
+                    continue
+                if self._signs.get(chat_id) != reply_sign:
+                    self._signs[chat_id] = reply_sign
+                    changed.append((chat_id, reply_sign))
+
+        if changed and self.store:
+            self.store.save_reply_signs(changed)
+        return len(changed)
+
+    def get(self, chat_id):
+        reply_sign = self._signs.get(chat_id)
+        if reply_sign:
+            return reply_sign
+
+        if self.store:
+            reply_sign = self.store.get_reply_sign(chat_id)
+            if reply_sign:
+                with self._lock:
+                    self._signs[chat_id] = reply_sign
+                return reply_sign
+
+        return None
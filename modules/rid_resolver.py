@@ -0,0 +1,113 @@
+import logging
+from collections import namedtuple
+
+from .chat_rid_index import (
+    SOURCE_CURRENT_EVENTS,
+    SOURCE_GOOD_CARD,
+    SOURCE_TEXT,
+)
+from .order_extractor import extract_order_candidates
+
+SOURCE_CACHE = "cache"
+
+SOURCE_LABELS = {
+    SOURCE_CACHE: "кэша чата",
+    SOURCE_GOOD_CARD: "goodCard текущего сообщения",
+    SOURCE_TEXT: "текста сообщения",
+    SOURCE_CURRENT_EVENTS: "текущих событий",
+}
+
+SOURCE_SCORES = {
+    SOURCE_GOOD_CARD: 100,
+    SOURCE_CURRENT_EVENTS: 70,
+    SOURCE_CACHE: 60,
+}
+
+# Номер из текста надежен настолько, насколько однозначен его шаблон
+TEXT_KIND_SCORES = {
+    "day_rid": 80,
+    "order_keyword": 75,
+    "assembly_keyword": 75,
+    "number_keyword": 65,
+    "order_en": 65,
+    "uuid": 55,
+    "short_code": 50,
+}
+
+VERIFIED_BONUS = 100
+AGREEMENT_BONUS = 10
+
+RidCandidate = namedtuple("RidCandidate", ["rid", "source", "score"])
+RidResolution = namedtuple("RidResolution", ["rid", "order_id", "source", "score"])
+
+
+class RidResolver:
+    def __init__(self, db, chat_rid_index):
+        self.db = db
+        self.chat_rid_index = chat_rid_index
+
+    def gather(self, chat_id, attachments, text, event_index):
+        candidates = []
+
+        good_card = (attachments or {}).get("goodCard")
+        if good_card and good_card.get("rid"):
+            candidates.append(
+                RidCandidate(
+                    good_card["rid"], SOURCE_GOOD_CARD, SOURCE_SCORES[SOURCE_GOOD_CARD]
+                )
+            )
+
+        for value, kind in extract_order_candidates(text):
+            candidates.append(
+                RidCandidate(value, SOURCE_TEXT, TEXT_KIND_SCORES.get(kind, 50))
+            )
+
+        if event_index is not None:
+            current_card = event_index.good_card_for(chat_id)
+            if current_card and current_card.get("rid"):
+                candidates.append(
+                    RidCandidate(
+                        current_card["rid"],
+                        SOURCE_CURRENT_EVENTS,
+                        SOURCE_SCORES[SOURCE_CURRENT_EVENTS],
+                    )
+                )
+
+        cached_rid = self.chat_rid_index.get(chat_id)
+        if cached_rid:
+            candidates.append(
+                RidCandidate(cached_rid, SOURCE_CACHE, SOURCE_SCORES[SOURCE_CACHE])
+            )
+
+        return candidates
+
+    def pick(self, candidates):
+        if not candidates:
+            return None
+
+        # Одним запросом проверяем все кандидаты по базе заказов
+        matches = self.db.match_rid_candidates({c.rid for c in candidates})
+
+        by_rid = {}
+        for candidate in candidates:
+            by_rid.setdefault(candidate.rid, []).append(candidate)
+
+        best = None
+        for rid, group in by_rid.items():
+            top = max(group, key=lambda c: c.score)
+            order_id = matches.get(rid)
+            score = top.score + AGREEMENT_BONUS * (len(group) - 1)
+            if order_id:
+                score += VERIFIED_BONUS
+            resolution = RidResolution(rid, order_id, top.source, score)
+            logging.info(
+                f"      Кандидат RID {rid} из {SOURCE_LABELS[top.source]}: "
+                f"оценка {score}, заказ {order_id or 'не найден'}"
+            )
+            if best is None or resolution.score > best.score:
+                best = resolution
+
+        return best
+
+    def resolve(self, chat_id, attachments, text, event_index):
+        return self.pick(self.gather(chat_id, attachments, text, event_index))
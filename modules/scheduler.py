@@ -0,0 +1,147 @@
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+FIXED_RATE = "rate"
+FIXED_DELAY = "delay"
+
+
+class ScheduledJob:
+    def __init__(self, name, func, interval, mode, jitter, kwargs):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.mode = mode
+        self.jitter = jitter
+        self.kwargs = kwargs
+        # Плановая точка без разброса: от нее отсчитывается фиксированный темп
+        self.slot = None
+        self.running = False
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_duration = 0.0
+        self.last_error = None
+
+    def stats(self):
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "last_duration": round(self.last_duration, 3),
+            "last_error": self.last_error,
+        }
+
+
+class Scheduler:
+    def __init__(self, max_workers=4):
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="job"
+        )
+        self._jobs = {}
+        self._queue = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+
+    def add_job(
+        self,
+        name,
+        func,
+        interval,
+        mode=FIXED_DELAY,
+        jitter=0.0,
+        run_immediately=True,
+        **kwargs,
+    ):
+        if mode not in (FIXED_RATE, FIXED_DELAY):
+            raise ValueError(f"Неизвестный режим расписания: {mode}")
+
+        job = ScheduledJob(name, func, interval, mode, jitter, kwargs)
+        job.slot = time.monotonic() + (0 if run_immediately else interval)
+        with self._cond:
+            self._jobs[name] = job
+            self._push(job.slot + self._jitter(job), job)
+        logging.info(
+            f"Задача '{name}': каждые {interval} с ({mode}), разброс до {jitter} с"
+        )
+        return job
+
+    def _jitter(self, job):
+        return random.uniform(0, job.jitter) if job.jitter else 0.0
+
+    def _push(self, run_at, job):
+        heapq.heappush(self._queue, (run_at, next(self._seq), job))
+        self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {name: job.stats() for name, job in self._jobs.items()}
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            with self._cond:
+                if not self._queue:
+                    self._cond.wait()
+                    continue
+
+                if self._stop.is_set():
+                    break
+
+                run_at, _, job = self._queue[0]
+                delay = run_at - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+
+                heapq.heappop(self._queue)
+                self._dispatch(job)
+
+    def _dispatch(self, job):
+        if job.mode == FIXED_RATE:
+            # Следующий запуск считается от плановой точки без разброса, чтобы
+            # разброс не накапливался; пропущенные слоты не догоняются пачкой
+            next_slot = job.slot + job.interval
+            now = time.monotonic()
+            while next_slot <= now:
+                next_slot += job.interval
+            job.slot = next_slot
+            self._push(next_slot + self._jitter(job), job)
+
+        if job.running:
+            # Предыдущий запуск еще не закончился: не накладываем выполнения
+            job.skipped += 1
+            logging.warning(f"Задача '{job.name}' еще выполняется, запуск пропущен")
+            return
+
+        job.running = True
+        self.executor.submit(self._execute, job)
+
+    def _execute(self, job):
+        started = time.monotonic()
+        try:
+            job.func(**job.kwargs)
+            job.last_error = None
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)
+            logging.error(f"Ошибка в задаче '{job.name}': {e}")
+        finally:
+            finished = time.monotonic()
+            with self._cond:
+                job.runs += 1
+                job.last_duration = finished - started
+                job.running = False
+                if job.mode == FIXED_DELAY and not self._stop.is_set():
+                    job.slot = finished + job.interval
+                    self._push(job.slot + self._jitter(job), job)
+
+    def stop(self, wait=True):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        self.executor.shutdown(wait=wait)
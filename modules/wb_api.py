@@ -5,9 +5,11 @@ from .base_api import BaseAPIClient
 
 
 class WildberriesAPI(BaseAPIClient):
-    def __init__(self, api_key):
+    def __init__(self, api_key, pool_size=10):
         super().__init__(
-            api_key, base_url="https://marketplace-api.wildberries.ru/api/v3"
+            api_key,
+            base_url="https://marketplace-api.wildberries.ru/api/v3",
+            pool_size=pool_size,
         )
 
     def get_recent_orders(self, days=1):
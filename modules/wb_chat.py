@@ -1,12 +1,50 @@
 import logging
+import threading
 import uuid
-import requests
 from .base_api import BaseAPIClient
+from .chat_history import ChatHistorySnapshot, extract_chats
+from .reply_signs import ReplySignCache
+
+MESSAGE_URL = "https://buyer-chat-api.wildberries.ru/api/v1/seller/message"
+
+MESSAGE_HEADERS = {
+    "Content-Type": "application/json; charset=utf-8",
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
+}
+
+
+def build_message_payload(chat_id, text, reply_sign, message_id=None):
+    return {
+        "id": message_id or str(uuid.uuid4()),
+        "chatID": chat_id,
+        "text": text,
+        "message": text,
+        "type": "text",
+        "replySign": reply_sign,
+    }
 
 
 class WBChatAPI(BaseAPIClient):
-    def __init__(self, api_key):
+    def __init__(
+        self,
+        api_key,
+        history_ttl=60,
+        reply_sign_store=None,
+        pool_size=10,
+        history_cursor=None,
+        history_max_pages=10,
+        history_max_events=20000,
+    ):
         self.api_key = api_key
+        self.reply_signs = ReplySignCache(reply_sign_store)
+        self.history_ttl = history_ttl
+        # Снимок истории строится от курсора опроса, а не от начала ленты
+        self.history_cursor = history_cursor
+        self.history_max_pages = history_max_pages
+        self.history_max_events = history_max_events
+        self._history_snapshot = None
+        self._history_lock = threading.Lock()
+        self._history_refresh_lock = threading.Lock()
         base_url = "https://buyer-chat-api.wildberries.ru"
 
         super().__init__(
@@ -14,20 +52,17 @@ class WBChatAPI(BaseAPIClient):
             base_url=base_url,
             host_header="buyer-chat-api.wildberries.ru",
             timeout=15,
+            pool_size=pool_size,
         )
         self.session.headers["Authorization"] = api_key
         logging.info("WBChatAPI инициализирован")
 
     def get_chats_list(self):
         try:
-            url = "https://buyer-chat-api.wildberries.ru/api/v1/seller/chats"
-            headers = {
-                "Authorization": self.api_key,
-                "Content-Type": "application/json",
-            }
-            response = requests.get(url, headers=headers, timeout=10, verify=False)
-            if response.status_code == 200:
-                return response.json()
+            chats_data = self._request("GET", "/api/v1/seller/chats", timeout=10)
+            if isinstance(chats_data, dict):
+                self.remember_reply_signs(extract_chats(chats_data))
+                return chats_data
         except Exception as e:
             logging.error(f"Ошибка получения списка чатов: {e}")
         return None
@@ -38,35 +73,63 @@ class WBChatAPI(BaseAPIClient):
         if next_timestamp:
             params["next"] = next_timestamp
         data = self._request("GET", endpoint, params=params, timeout=10)
+        if isinstance(data, dict) and isinstance(data.get("result"), dict):
+            self.remember_reply_signs(data["result"].get("events") or [])
         return data
 
-    def send_message(self, chat_id, text, reply_sign=None):
-        try:
-            url = "https://buyer-chat-api.wildberries.ru/api/v1/seller/message"
+    def remember_reply_signs(self, items):
+        return self.reply_signs.remember(items)
+
+    def get_reply_sign(self, chat_id, refresh=True):
+        reply_sign = self.reply_signs.get(chat_id)
+        if reply_sign:
+            return reply_sign
+
+        if refresh:
+            logging.info(f"replySign для чата {chat_id} не найден, обновляем список чатов")
+            self.get_chats_list()
+            return self.reply_signs.get(chat_id)
+
+        return None
+
+    def iter_event_pages(self, next_timestamp=None, max_pages=50):
+        cursor = next_timestamp
+
+        for _ in range(max_pages):
+            data = self.get_chat_events(cursor)
+            if not data or "result" not in data:
+                return
+
+            result = data["result"] or {}
+            events = result.get("events") or []
+            next_cursor = result.get("next")
+
+            if events:
+                yield events, next_cursor
+
+            # Пустая страница или неподвижный курсор означают, что лента догнана
+            if not events or not next_cursor or next_cursor == cursor:
+                return
+            cursor = next_cursor
 
+        logging.warning(
+            f"Достигнут лимит страниц ленты событий ({max_pages}), курсор: {cursor}"
+        )
+
+    def send_message(self, chat_id, text, reply_sign=None, message_id=None):
+        try:
             if not reply_sign or reply_sign.startswith("chat_"):
-                reply_sign = self._get_reply_sign_from_chat(chat_id)
-
-            payload = {
-                "id": str(uuid.uuid4()),
-                "chatID": chat_id,
-                "text": text,
-                "message": text,
-                "type": "text",
-                "replySign": reply_sign,
-            }
-
-            headers = {
-                "Authorization": self.api_key,
-                "Content-Type": "application/json; charset=utf-8",
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
-            }
+                reply_sign = self.get_reply_sign(
+                    chat_id
+                ) or self._get_reply_sign_from_chat(chat_id)
+
+            payload = build_message_payload(chat_id, text, reply_sign, message_id)
 
             logging.info(f"Отправка в чат {chat_id}")
             logging.info(f"Payload ID: {payload['id']}")
 
-            response = requests.post(
-                url, json=payload, headers=headers, timeout=30, verify=False
+            response = self._send(
+                "POST", MESSAGE_URL, json=payload, headers=MESSAGE_HEADERS, timeout=30
             )
 
             if response.status_code == 200:
@@ -80,27 +143,74 @@ class WBChatAPI(BaseAPIClient):
             logging.error(f"Ошибка send_message: {e}")
             return False
 
-    def _get_reply_sign_from_chat(self, chat_id):
-        try:
-            events_data = self.get_chat_events()
-            candidates = []
-            if events_data and "events" in events_data:
-                for event in events_data["events"]:
-                    if event.get("chatID") == chat_id and "replySign" in event:
-                        candidates.append(event["replySign"])
+    def get_history_snapshot(self, max_age=None):
+        max_age = self.history_ttl if max_age is None else max_age
+
+        # Один снимок истории на цикл опроса: поиск replySign читает
+        # его вместо повторной выгрузки ленты
+        with self._history_lock:
+            snapshot = self._history_snapshot
+            if snapshot and snapshot.is_fresh(max_age):
+                return snapshot
 
-            if candidates:
-                return candidates[-1]
+        # Запросы к API идут вне _history_lock: пока один поток дочитывает
+        # ленту, остальные получают прежний снимок и не ждут
+        if not self._history_refresh_lock.acquire(blocking=snapshot is None):
+            return snapshot
 
+        try:
+            with self._history_lock:
+                snapshot = self._history_snapshot
+                if snapshot and snapshot.is_fresh(max_age):
+                    return snapshot
+                cursor = (snapshot and snapshot.cursor) or self.history_cursor
+
+            # Дочитываются только страницы после курсора снимка
+            pages = list(
+                self.iter_event_pages(cursor, max_pages=self.history_max_pages)
+            )
             chats_data = self.get_chats_list()
-            if (
-                chats_data
-                and "result" in chats_data
-                and "chats" in chats_data["result"]
-            ):
-                for chat in chats_data["result"]["chats"]:
-                    if chat.get("chatID") == chat_id and "replySign" in chat:
-                        return chat["replySign"]
+
+            with self._history_lock:
+                snapshot = self._history_snapshot or ChatHistorySnapshot(
+                    [], None, cursor, self.history_max_events
+                )
+                added = sum(
+                    len(events)
+                    for events, next_cursor in pages
+                    if snapshot.add_page(events, next_cursor)
+                )
+                snapshot.refresh_chats(chats_data)
+                self._history_snapshot = snapshot
+
+            logging.info(
+                f"Снимок истории чатов обновлен: +{added} событий, "
+                f"всего {snapshot.event_count}, {len(snapshot.chats)} чатов"
+            )
+            return snapshot
+        finally:
+            self._history_refresh_lock.release()
+
+    def extend_history(self, events, next_cursor):
+        # Страницы, полученные опросом, сразу попадают в снимок истории
+        with self._history_lock:
+            if next_cursor:
+                self.history_cursor = next_cursor
+            if self._history_snapshot is None:
+                self._history_snapshot = ChatHistorySnapshot(
+                    [], None, None, self.history_max_events
+                )
+            self._history_snapshot.add_page(events, next_cursor)
+
+    def invalidate_history_snapshot(self):
+        with self._history_lock:
+            self._history_snapshot = None
+
+    def _get_reply_sign_from_chat(self, chat_id):
+        try:
+            reply_sign = self.get_history_snapshot().reply_sign_for(chat_id)
+            if reply_sign:
+                return reply_sign
 
             return f"chat_{chat_id}"
         except Exception:
@@ -1,23 +1,76 @@
 import logging
+import threading
+import time
+from collections import namedtuple
 
 from .base_api import BaseAPIClient
 
+OrdersDiff = namedtuple("OrdersDiff", ["added", "removed"])
+
 
 class WBMarketplaceAPI(BaseAPIClient):
-    def __init__(self, api_key):
+    def __init__(self, api_key, pool_size=10, orders_ttl=60):
         super().__init__(
-            api_key=api_key, base_url="https://marketplace-api.wildberries.ru/api/v3"
+            api_key=api_key,
+            base_url="https://marketplace-api.wildberries.ru/api/v3",
+            pool_size=pool_size,
         )
+        # Снимок /orders/new переиспользуется в пределах TTL, чтобы путь
+        # обработки чатов не запрашивал тот же список повторно
+        self.orders_ttl = orders_ttl
+        self._orders_snapshot = None
+        self._orders_fetched_at = 0.0
+        self._orders_lock = threading.Lock()
+        self.last_diff = OrdersDiff(set(), set())
         logging.info("WBMarketplaceAPI инициализирован")
 
-    def get_new_orders(self):
-        logging.info("Запрос новых заказов через Marketplace API...")
-        data = self._request("GET", "/orders/new")
+    def get_new_orders(self, max_age=None):
+        max_age = self.orders_ttl if max_age is None else max_age
+
+        with self._orders_lock:
+            if (
+                self._orders_snapshot is not None
+                and time.monotonic() - self._orders_fetched_at < max_age
+            ):
+                return self._orders_snapshot
+
+            logging.info("Запрос новых заказов через Marketplace API...")
+            data = self._request("GET", "/orders/new")
 
-        if data and isinstance(data, dict) and "orders" in data:
-            orders = data["orders"]
-            logging.info(f"Получено новых заказов через Marketplace API: {len(orders)}")
-            return orders
+            if data and isinstance(data, dict) and "orders" in data:
+                orders = data["orders"]
+                logging.info(
+                    f"Получено новых заказов через Marketplace API: {len(orders)}"
+                )
+                self._store_snapshot(orders)
+                return orders
 
         logging.warning("Не удалось получить заказы или список пуст.")
         return []
+
+    def store_snapshot(self, orders):
+        with self._orders_lock:
+            return self._store_snapshot(orders)
+
+    def _store_snapshot(self, orders):
+        previous_ids = {
+            str(order.get("id")) for order in self._orders_snapshot or []
+        }
+        current_ids = {str(order.get("id")) for order in orders}
+
+        self.last_diff = OrdersDiff(
+            added=current_ids - previous_ids, removed=previous_ids - current_ids
+        )
+        self._orders_snapshot = orders
+        self._orders_fetched_at = time.monotonic()
+
+        if self.last_diff.added or self.last_diff.removed:
+            logging.info(
+                f"Изменения в заказах: +{len(self.last_diff.added)} "
+                f"-{len(self.last_diff.removed)}"
+            )
+        return self.last_diff
+
+    def get_orders_diff(self, max_age=None):
+        orders = self.get_new_orders(max_age)
+        return orders, self.last_diff
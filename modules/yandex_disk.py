@@ -4,21 +4,39 @@ import time
 import requests
 import urllib3
 
+from .base_api import create_session
+from .lru_cache import LRUCache
+
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 
 class YandexDiskManager:
-    def __init__(self, token):
+    def __init__(
+        self,
+        token,
+        folder_store=None,
+        folder_cache_size=4096,
+        upload_retries=3,
+        upload_retry_delay=0.25,
+        pool_size=10,
+    ):
         self.base_url = "https://cloud-api.yandex.net/v1/disk/resources"
-        self.session = requests.Session()
-        self.session.headers.update(
+        # Папки, существование которых уже подтверждено (201/409):
+        # LRU в памяти поверх таблицы known_folders в SQLite
+        self.folder_store = folder_store
+        self.known_folders = LRUCache(maxsize=folder_cache_size)
+        self.upload_retries = upload_retries
+        self.upload_retry_delay = upload_retry_delay
+        self.session = create_session(
             {
                 "Authorization": f"OAuth {token}",
                 "Content-Type": "application/json",
-            }
+            },
+            pool_size=pool_size,
         )
-
-        self.session.verify = False
+        # Отдельный пул для PUT по ссылкам загрузки: без OAuth-заголовка
+        # и без повторов, т.к. тело может быть одноразовым генератором
+        self.upload_session = create_session(pool_size=pool_size, retries=0)
 
         if not self.check_token_validity():
             logging.error("Проблема с токеном Яндекс.Диска!")
@@ -46,10 +64,39 @@ class YandexDiskManager:
             logging.error(f"Ошибка проверки токена: {e}")
             return False
 
+    def _normalize_path(self, path):
+        if not path.startswith("/"):
+            path = "/" + path
+        return path.rstrip("/") or "/"
+
+    def is_folder_known(self, path):
+        path = self._normalize_path(path)
+        if path in self.known_folders:
+            return True
+        if self.folder_store and self.folder_store.is_known_folder(path):
+            self.known_folders.put(path)
+            return True
+        return False
+
+    def remember_folder(self, path):
+        path = self._normalize_path(path)
+        self.known_folders.put(path)
+        if self.folder_store:
+            self.folder_store.add_known_folder(path)
+
+    def forget_folder(self, path):
+        path = self._normalize_path(path)
+        self.known_folders.pop(path)
+        self.known_folders.pop_prefix(path + "/")
+        if self.folder_store:
+            self.folder_store.forget_known_folders(path)
+
     def create_folder(self, path):
         try:
-            if not path.startswith("/"):
-                path = "/" + path
+            path = self._normalize_path(path)
+
+            if self.is_folder_known(path):
+                return True
 
             response = self.session.put(
                 "https://cloud-api.yandex.net/v1/disk/resources",
@@ -59,6 +106,7 @@ class YandexDiskManager:
 
             if response.status_code in [201, 409]:
                 logging.info(f"Папка создана: '{path}'")
+                self.remember_folder(path)
                 return True
             else:
                 logging.error(
@@ -70,18 +118,25 @@ class YandexDiskManager:
             logging.error(f"Ошибка при создании папки '{path}': {e}")
             return False
 
-    def upload_file_from_memory(self, file_content, disk_path):
-        try:
-            if not disk_path.startswith("/"):
-                disk_path = "/" + disk_path
+    def ensure_path(self, path):
+        path = self._normalize_path(path)
+        if path == "/" or self.is_folder_known(path):
+            return True
 
-            logging.info(f"Загрузка файла на Яндекс.Диск: {disk_path}")
+        # Создаем недостающих предков сверху вниз; каждый подтвержденный
+        # уровень запоминается, поэтому повторно запросы не отправляются
+        parts = path.strip("/").split("/")
+        for depth in range(1, len(parts) + 1):
+            ancestor = "/" + "/".join(parts[:depth])
+            if not self.create_folder(ancestor):
+                return False
+        return True
 
-            folder_path = "/".join(disk_path.split("/")[:-1])
-            if folder_path:
-                self.create_folder(folder_path)
-                time.sleep(1)
+    def _get_upload_url(self, disk_path):
+        folder_path = "/".join(disk_path.split("/")[:-1])
+        delay = self.upload_retry_delay
 
+        for attempt in range(self.upload_retries + 1):
             response = self.session.get(
                 "https://cloud-api.yandex.net/v1/disk/resources/upload",
                 params={"path": disk_path, "overwrite": "true"},
@@ -94,32 +149,89 @@ class YandexDiskManager:
                 upload_url = response.json().get("href")
                 if not upload_url:
                     logging.error("Нет URL для загрузки в ответе")
-                    return False
+                return upload_url
 
-                put_response = requests.put(
-                    upload_url, data=file_content, timeout=30, verify=False
+            # 409/404 означают, что родительская папка еще не видна API:
+            # сбрасываем кэш, пересоздаем путь и повторяем с растущей паузой
+            if response.status_code in [404, 409] and attempt < self.upload_retries:
+                logging.warning(
+                    f"Папка для {disk_path} недоступна ({response.status_code}), "
+                    f"повтор через {delay:.2f} с"
                 )
+                if folder_path:
+                    self.forget_folder(folder_path)
+                    self.ensure_path(folder_path)
+                time.sleep(delay)
+                delay *= 2
+                continue
+
+            logging.error(
+                f"Ошибка получения URL: {response.status_code} - {response.text}"
+            )
+            return None
 
-                logging.info(f"Статус загрузки: {put_response.status_code}")
+        return None
 
-                if put_response.status_code in [200, 201]:
-                    logging.info(f"Файл успешно загружен на Яндекс.Диск: {disk_path}")
-                    return True
-                else:
-                    logging.error(
-                        f"Ошибка загрузки файла: {put_response.status_code} - {put_response.text}"
-                    )
-                    return False
-            else:
-                logging.error(
-                    f"Ошибка получения URL: {response.status_code} - {response.text}"
-                )
+    def _put_file(self, upload_url, data, disk_path):
+        put_response = self.upload_session.put(upload_url, data=data, timeout=30)
+
+        logging.info(f"Статус загрузки: {put_response.status_code}")
+
+        if put_response.status_code in [200, 201]:
+            logging.info(f"Файл успешно загружен на Яндекс.Диск: {disk_path}")
+            return True
+
+        logging.error(
+            f"Ошибка загрузки файла: {put_response.status_code} - {put_response.text}"
+        )
+        return False
+
+    def upload_file_from_memory(self, file_content, disk_path):
+        try:
+            if not disk_path.startswith("/"):
+                disk_path = "/" + disk_path
+
+            logging.info(f"Загрузка файла на Яндекс.Диск: {disk_path}")
+
+            folder_path = "/".join(disk_path.split("/")[:-1])
+            if folder_path and not self.ensure_path(folder_path):
+                logging.error(f"Не удалось создать путь: {folder_path}")
                 return False
 
+            upload_url = self._get_upload_url(disk_path)
+            if not upload_url:
+                return False
+
+            return self._put_file(upload_url, file_content, disk_path)
+
         except Exception as e:
             logging.error(f"Исключение при загрузке на Яндекс.Диск: {e}")
             return False
 
+    def upload_stream(self, chunks, disk_path):
+        try:
+            if not disk_path.startswith("/"):
+                disk_path = "/" + disk_path
+
+            logging.info(f"Потоковая загрузка файла на Яндекс.Диск: {disk_path}")
+
+            folder_path = "/".join(disk_path.split("/")[:-1])
+            if folder_path and not self.ensure_path(folder_path):
+                logging.error(f"Не удалось создать путь: {folder_path}")
+                return False
+
+            upload_url = self._get_upload_url(disk_path)
+            if not upload_url:
+                return False
+
+            # Генератор передается в PUT как есть: requests отправит тело
+            # с Transfer-Encoding: chunked по мере чтения источника
+            return self._put_file(upload_url, chunks, disk_path)
+
+        except Exception as e:
+            logging.error(f"Исключение при потоковой загрузке на Яндекс.Диск: {e}")
+            return False
+
     def ensure_root_folders(self):
         logging.info("Проверка наличия корневых папок на Яндекс.Диске...")
         self.create_folder("WB_Orders")
@@ -134,7 +246,8 @@ class YandexDiskManager:
             logging.error(f"Ошибка запроса к Yandex.Disk ({url}): {e}")
             return None
 
-    def move_folder(self, from_path, to_path):
+    def start_move(self, from_path, to_path):
+        # Возвращает (статус, ссылка на операцию): done, pending, missing или error
         try:
             if not from_path.startswith("/"):
                 from_path = "/" + from_path
@@ -147,18 +260,62 @@ class YandexDiskManager:
                 timeout=30,
             )
 
-            if response.status_code in [201, 202]:
+            if response.status_code == 201:
                 logging.info(f"Папка перемещена: {from_path} -> {to_path}")
-                return True
+                self.forget_folder(from_path)
+                return "done", None
+            elif response.status_code == 202:
+                # Большие папки перемещаются асинхронно, статус доступен по ссылке
+                logging.info(f"Перемещение запущено: {from_path} -> {to_path}")
+                self.forget_folder(from_path)
+                return "pending", response.json().get("href")
             elif response.status_code == 404:
                 logging.warning(f"Папка не найдена: {from_path}")
-                return False
+                self.forget_folder(from_path)
+                return "missing", None
             else:
                 logging.error(
                     f"Ошибка перемещения папки: {response.status_code} - {response.text}"
                 )
-                return False
+                return "error", None
 
         except Exception as e:
             logging.error(f"Ошибка при перемещении папки: {e}")
-            return False
+            return "error", None
+
+    def move_folder(self, from_path, to_path):
+        status, _ = self.start_move(from_path, to_path)
+        return status in ("done", "pending")
+
+    def get_operation_status(self, href):
+        try:
+            response = self._request("GET", href)
+            if response is None or response.status_code != 200:
+                return None
+            return response.json().get("status")
+        except Exception as e:
+            logging.error(f"Ошибка получения статуса операции ({href}): {e}")
+            return None
+
+    def wait_operations(self, operations, timeout=300, poll_interval=2):
+        # operations: {ключ: ссылка}; результат: {ключ: success | failed | None}
+        results = {}
+        pending = dict(operations)
+        deadline = time.monotonic() + timeout
+
+        while pending:
+            for key, href in list(pending.items()):
+                status = self.get_operation_status(href)
+                if status in ("success", "failed"):
+                    results[key] = status
+                    del pending[key]
+
+            if not pending or time.monotonic() >= deadline:
+                break
+            time.sleep(poll_interval)
+
+        for key in pending:
+            logging.warning(f"Операция Яндекс.Диска не завершилась вовремя: {key}")
+            results[key] = None
+
+        return results
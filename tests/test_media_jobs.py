@@ -0,0 +1,112 @@
+from collections import namedtuple
+from concurrent.futures import Future
+
+import pytest
+
+from modules.database import DatabaseManager
+from modules.media_jobs import MediaJobQueue
+
+# Та же форма, что у media_transfer.TransferResult (модуль требует requests)
+Result = namedtuple("Result", ["source_url", "disk_path", "success", "error"])
+
+
+class FakePool:
+    def __init__(self, outcomes=None):
+        self.outcomes = list(outcomes or [])
+        self.submitted = []
+
+    def submit(self, source_url, disk_path):
+        self.submitted.append((source_url, disk_path))
+        success = self.outcomes.pop(0) if self.outcomes else True
+        future = Future()
+        future.set_result(
+            Result(source_url, disk_path, success, None if success else "boom")
+        )
+        return future
+
+
+@pytest.fixture
+def db(tmp_path):
+    return DatabaseManager(str(tmp_path / "wb_orders.db"))
+
+
+def job_rows(db):
+    return db.conn.execute(
+        "SELECT folder, state, attempts, last_error FROM media_jobs ORDER BY id"
+    ).fetchall()
+
+
+def test_successful_transfer_marks_job_done(db):
+    queue = MediaJobQueue(db, FakePool())
+
+    future = queue.submit("https://cdn/1.jpg", "WB_Orders/1/photo_1_1.jpg")
+
+    assert future.result().success
+    assert job_rows(db) == [("WB_Orders/1", "done", 1, None)]
+
+
+def test_failed_transfer_is_retried_until_done(db):
+    pool = FakePool(outcomes=[False, True])
+    queue = MediaJobQueue(db, pool, base_delay=0)
+
+    queue.submit("https://cdn/1.jpg", "WB_Orders/1/photo_1_1.jpg")
+    assert job_rows(db) == [("WB_Orders/1", "pending", 1, "boom")]
+
+    assert queue.dispatch_due() == 1
+    assert job_rows(db) == [("WB_Orders/1", "done", 2, None)]
+    assert len(pool.submitted) == 2
+
+
+def test_retry_waits_for_backoff(db):
+    queue = MediaJobQueue(db, FakePool(outcomes=[False]), base_delay=60)
+
+    queue.submit("https://cdn/1.jpg", "WB_Orders/1/photo_1_1.jpg")
+
+    assert queue.dispatch_due() == 0
+
+
+def test_job_fails_after_max_attempts(db):
+    queue = MediaJobQueue(db, FakePool(outcomes=[False, False]), max_attempts=2, base_delay=0)
+
+    queue.submit("https://cdn/1.jpg", "WB_Orders/1/photo_1_1.jpg")
+    queue.dispatch_due()
+
+    assert job_rows(db) == [("WB_Orders/1", "failed", 2, "boom")]
+    assert queue.dispatch_due() == 0
+
+
+def test_redelivered_attachment_is_not_queued_twice(db):
+    pool = FakePool()
+    queue = MediaJobQueue(db, pool)
+
+    queue.submit("https://cdn/1.jpg", "WB_Orders/1/photo_1000_1.jpg")
+    # Повторная доставка: то же вложение, новое имя файла с другой меткой времени
+    assert queue.submit("https://cdn/1.jpg", "WB_Orders/1/photo_2000_1.jpg") is None
+    # В другую папку то же вложение ставится отдельно
+    assert queue.submit("https://cdn/1.jpg", "WB_Orders/2/photo_2000_1.jpg")
+
+    assert len(pool.submitted) == 2
+    assert [row[0] for row in job_rows(db)] == ["WB_Orders/1", "WB_Orders/2"]
+
+
+def test_db_error_falls_back_to_direct_transfer(db):
+    pool = FakePool()
+    queue = MediaJobQueue(db, pool)
+    db.conn.execute("DROP TABLE media_jobs")
+
+    future = queue.submit("https://cdn/1.jpg", "WB_Orders/1/photo_1_1.jpg")
+
+    assert future is not None and future.result().success
+    assert pool.submitted == [("https://cdn/1.jpg", "WB_Orders/1/photo_1_1.jpg")]
+
+
+def test_running_jobs_resume_after_restart(db):
+    db.add_media_job("https://cdn/1.jpg", "WB_Orders/1/photo_1_1.jpg", state="running")
+    pool = FakePool()
+    queue = MediaJobQueue(db, pool, poll_interval=60)
+
+    queue.start()
+    queue.stop(timeout=5)
+
+    assert pool.submitted == [("https://cdn/1.jpg", "WB_Orders/1/photo_1_1.jpg")]
+    assert job_rows(db)[0][1] == "done"
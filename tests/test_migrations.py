@@ -0,0 +1,96 @@
+import sqlite3
+import time
+
+from modules.database import DatabaseManager
+from modules.migrations import MIGRATIONS
+
+# Схема assembly_tasks в рабочих копиях БД до появления миграций
+LEGACY_SCHEMA = """
+    CREATE TABLE assembly_tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        rid TEXT UNIQUE,
+        orderUid TEXT,
+        nmId INTEGER,
+        article TEXT,
+        price REAL,
+        createdAt TEXT,
+        status TEXT DEFAULT 'new',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+def make_legacy_db(path):
+    conn = sqlite3.connect(path)
+    conn.execute(LEGACY_SCHEMA)
+    conn.execute(
+        "INSERT INTO assembly_tasks (rid, orderUid, article) VALUES ('old', 'u0', 'a')"
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_legacy_db_is_migrated_to_latest_version(tmp_path):
+    path = str(tmp_path / "wb_orders.db")
+    make_legacy_db(path)
+
+    db = DatabaseManager(path)
+
+    version = db.conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0]
+    assert version == MIGRATIONS[-1][0]
+    columns = {row[1] for row in db.conn.execute("PRAGMA table_info(assembly_tasks)")}
+    assert {"last_activity", "moved_to_empty"} <= columns
+    row = db.conn.execute(
+        "SELECT last_activity, moved_to_empty FROM assembly_tasks WHERE rid = 'old'"
+    ).fetchone()
+    assert row[0] is not None
+    assert row[1] == 0
+
+
+def test_migrations_are_not_reapplied(tmp_path):
+    path = str(tmp_path / "wb_orders.db")
+    make_legacy_db(path)
+    DatabaseManager(path).conn.close()
+
+    db = DatabaseManager(path)
+
+    count = db.conn.execute("SELECT COUNT(*) FROM schema_version").fetchone()[0]
+    assert count == len(MIGRATIONS)
+
+
+def test_order_inserted_after_migration_becomes_inactive(tmp_path):
+    path = str(tmp_path / "wb_orders.db")
+    make_legacy_db(path)
+    db = DatabaseManager(path)
+
+    db.add_assembly_tasks_bulk([("bulk", "u1", 1, "a", 100.0, "2024-01-01", "new")])
+    db.add_assembly_task("single", "u2", 2, "b", 200.0, "2024-01-01")
+
+    rows = db.conn.execute(
+        "SELECT rid FROM assembly_tasks WHERE last_activity IS NULL"
+    ).fetchall()
+    assert rows == []
+
+    # CURRENT_TIMESTAMP хранится с точностью до секунды
+    time.sleep(1.1)
+    inactive = {row[0] for row in db.get_inactive_orders(hours=0)}
+    assert {"old", "bulk", "single"} <= inactive
+
+
+def test_null_last_activity_is_backfilled(tmp_path):
+    path = str(tmp_path / "wb_orders.db")
+    make_legacy_db(path)
+    db = DatabaseManager(path)
+    db.conn.execute(
+        "INSERT INTO assembly_tasks (rid, orderUid, article) VALUES ('lost', 'u3', 'c')"
+    )
+    db.conn.execute("DELETE FROM schema_version WHERE version >= 13")
+    db.conn.commit()
+    db.conn.close()
+
+    db = DatabaseManager(path)
+
+    row = db.conn.execute(
+        "SELECT last_activity FROM assembly_tasks WHERE rid = 'lost'"
+    ).fetchone()
+    assert row[0] is not None
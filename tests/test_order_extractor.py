@@ -0,0 +1,32 @@
+from modules.order_extractor import extract_order_candidates
+
+
+def test_plain_text_has_no_candidates():
+    assert extract_order_candidates("Здравствуйте! Прикрепляю фото для заказа") == []
+    assert extract_order_candidates("") == []
+    assert extract_order_candidates(None) == []
+
+
+def test_overlapping_matches_of_different_types_are_kept():
+    candidates = extract_order_candidates("номер:ABC12345678  AB1234567")
+
+    assert candidates == [
+        ("ABC12345678", "short_code"),
+        ("AB1234567", "short_code"),
+        ("ABC12345678", "number_keyword"),
+    ]
+
+
+def test_keyword_match_ignores_case():
+    assert extract_order_candidates("ЗАКАЗ: 4192894097123") == [
+        ("4192894097123", "order_keyword")
+    ]
+
+
+def test_day_rid_and_uuid():
+    text = "Заказ DAy.aa2b0f37e1744109a18cd38944ad50f1 и 0c3f2a1e-9b7d-4e2a-8c1f-5d6e7f8a9b0c"
+
+    kinds = {kind: value for value, kind in extract_order_candidates(text)}
+
+    assert kinds["day_rid"] == "aa2b0f37e1744109a18cd38944ad50f1"
+    assert kinds["uuid"] == "0c3f2a1e-9b7d-4e2a-8c1f-5d6e7f8a9b0c"
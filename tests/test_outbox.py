@@ -0,0 +1,111 @@
+import time
+
+import pytest
+
+from modules.database import DatabaseManager
+from modules.outbox import KIND_WELCOME, OutboxWorker
+
+
+class FakeChatAPI:
+    def __init__(self, results=None):
+        self.results = list(results or [])
+        self.sent = []
+
+    def send_message(self, chat_id, text, reply_sign=None, message_id=None):
+        self.sent.append((chat_id, text, reply_sign, message_id))
+        return self.results.pop(0) if self.results else True
+
+
+@pytest.fixture
+def db(tmp_path):
+    return DatabaseManager(str(tmp_path / "wb_orders.db"))
+
+
+def outbox_rows(db):
+    return db.conn.execute(
+        "SELECT chat_id, state, attempts, next_attempt_at FROM outbox ORDER BY id"
+    ).fetchall()
+
+
+def test_enqueue_and_send(db):
+    chat_api = FakeChatAPI()
+    worker = OutboxWorker(db, chat_api)
+
+    message_id = worker.enqueue(KIND_WELCOME, "chat-1", "rid-1", "Привет", "sign-1")
+
+    assert worker.drain_once() == 1
+    assert chat_api.sent == [("chat-1", "Привет", "sign-1", message_id)]
+    assert outbox_rows(db) == [("chat-1", "sent", 1, 0)]
+    assert worker.drain_once() == 0
+
+
+def test_duplicate_message_id_is_ignored(db):
+    assert db.enqueue_outbox("m-1", KIND_WELCOME, "chat-1", "rid", "t", None)
+    assert not db.enqueue_outbox("m-1", KIND_WELCOME, "chat-1", "rid", "t", None)
+    assert len(outbox_rows(db)) == 1
+
+
+def test_failed_send_is_retried_with_backoff(db):
+    chat_api = FakeChatAPI(results=[False, False])
+    worker = OutboxWorker(db, chat_api, base_delay=10, max_delay=600)
+    worker.enqueue(KIND_WELCOME, "chat-1", "rid-1", "Привет")
+
+    before = int(time.time())
+    worker.drain_once()
+
+    _, state, attempts, next_attempt_at = outbox_rows(db)[0]
+    assert (state, attempts) == ("pending", 1)
+    assert before + 10 <= next_attempt_at <= int(time.time()) + 10
+    # До наступления срока повтора сообщение не выбирается
+    assert worker.drain_once() == 0
+
+    db.conn.execute("UPDATE outbox SET next_attempt_at = 0")
+    db.conn.commit()
+    worker.drain_once()
+
+    _, state, attempts, next_attempt_at = outbox_rows(db)[0]
+    assert (state, attempts) == ("pending", 2)
+    assert next_attempt_at >= before + 20
+
+
+def test_message_fails_after_max_attempts(db):
+    chat_api = FakeChatAPI(results=[False, False])
+    worker = OutboxWorker(db, chat_api, base_delay=0, max_attempts=2)
+    worker.enqueue(KIND_WELCOME, "chat-1", "rid-1", "Привет")
+
+    worker.drain_once()
+    worker.drain_once()
+
+    assert outbox_rows(db)[0][1:3] == ("failed", 2)
+    assert worker.drain_once() == 0
+
+
+def test_reset_stuck_returns_sending_rows_to_queue(db):
+    db.enqueue_outbox("m-1", KIND_WELCOME, "chat-1", "rid", "t", None)
+    assert len(db.claim_outbox_batch(int(time.time()))) == 1
+    assert outbox_rows(db)[0][1] == "sending"
+    # Повторная выборка не отдает сообщение, которое уже отправляется
+    assert db.claim_outbox_batch(int(time.time())) == []
+
+    assert db.reset_stuck_outbox() == 1
+
+    assert outbox_rows(db)[0][1] == "pending"
+    assert len(db.claim_outbox_batch(int(time.time()))) == 1
+
+
+def test_chat_gate_replaces_processed_chats(db):
+    assert not db.chat_has_outbox_message("chat-1", KIND_WELCOME)
+
+    db.enqueue_outbox("m-1", KIND_WELCOME, "chat-1", "rid", "t", None)
+
+    assert db.chat_has_outbox_message("chat-1", KIND_WELCOME)
+    assert not db.chat_has_outbox_message("chat-2", KIND_WELCOME)
+    assert not db.chat_has_outbox_message("chat-1", "other")
+
+
+def test_failed_message_does_not_block_new_welcome(db):
+    db.enqueue_outbox("m-1", KIND_WELCOME, "chat-1", "rid", "t", None)
+    row_id = db.claim_outbox_batch(int(time.time()))[0][0]
+    db.mark_outbox_retry(row_id, "error", 0, final=True)
+
+    assert not db.chat_has_outbox_message("chat-1", KIND_WELCOME)
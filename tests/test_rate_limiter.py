@@ -0,0 +1,36 @@
+import pytest
+
+from modules.rate_limiter import TokenBucket, parse_retry_after
+
+
+def test_burst_then_spacing():
+    bucket = TokenBucket(rate=1, capacity=3)
+
+    waits = [bucket.reserve() for _ in range(5)]
+
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert waits[3:] == pytest.approx([1.0, 2.0], abs=0.05)
+
+
+def test_penalty_keeps_token_spacing_after_block():
+    bucket = TokenBucket(rate=1, capacity=10)
+
+    bucket.penalize(5)
+    waits = [bucket.reserve() for _ in range(4)]
+
+    assert waits == pytest.approx([5.0, 6.0, 7.0, 8.0], abs=0.05)
+
+
+def test_shorter_penalty_does_not_shorten_block():
+    bucket = TokenBucket(rate=1, capacity=10)
+
+    bucket.penalize(5)
+    bucket.penalize(1)
+
+    assert bucket.reserve() == pytest.approx(5.0, abs=0.05)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(None, 2.0) == 2.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT", 1.5) == 1.5
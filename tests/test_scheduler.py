@@ -0,0 +1,82 @@
+import threading
+import time
+
+import pytest
+
+from modules.scheduler import FIXED_DELAY, FIXED_RATE, Scheduler
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = Scheduler(max_workers=2)
+    thread = threading.Thread(target=scheduler.run_forever, daemon=True)
+    thread.start()
+    yield scheduler
+    scheduler.stop()
+    thread.join(timeout=5)
+
+
+def test_fixed_rate_keeps_pace_despite_jitter(scheduler):
+    starts = []
+    scheduler.add_job("tick", lambda: starts.append(time.monotonic()), 0.2,
+                      mode=FIXED_RATE, jitter=0.1)
+
+    time.sleep(2.05)
+
+    # Слоты 0, 0.2, ..., 2.0 с; разброс не накапливается и не теряет запуски
+    assert 9 <= len(starts) <= 11
+    first = starts[0]
+    for i, started in enumerate(starts):
+        drift = started - first - i * 0.2
+        assert -0.12 <= drift <= 0.15
+
+
+def test_fixed_rate_skips_overlapping_runs(scheduler):
+    active = []
+    overlaps = []
+
+    def slow():
+        overlaps.append(len(active))
+        active.append(1)
+        time.sleep(0.35)
+        active.pop()
+
+    scheduler.add_job("slow", slow, 0.1, mode=FIXED_RATE)
+    time.sleep(0.6)
+
+    stats = scheduler.stats()["slow"]
+    assert overlaps and max(overlaps) == 0
+    assert stats["skipped"] >= 3
+
+
+def test_fixed_delay_counts_from_end_of_run(scheduler):
+    starts = []
+
+    def work():
+        starts.append(time.monotonic())
+        time.sleep(0.1)
+
+    scheduler.add_job("work", work, 0.1, mode=FIXED_DELAY)
+    time.sleep(0.75)
+
+    assert 3 <= len(starts) <= 4
+    gaps = [b - a for a, b in zip(starts, starts[1:])]
+    assert all(gap >= 0.2 for gap in gaps)
+
+
+def test_failures_are_recorded_and_job_keeps_running(scheduler):
+    def broken():
+        raise RuntimeError("boom")
+
+    scheduler.add_job("broken", broken, 0.05)
+    time.sleep(0.3)
+
+    stats = scheduler.stats()["broken"]
+    assert stats["runs"] >= 2
+    assert stats["failures"] == stats["runs"]
+    assert stats["last_error"] == "boom"
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        Scheduler(max_workers=1).add_job("x", lambda: None, 1, mode="cron")